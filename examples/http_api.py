@@ -13,6 +13,9 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# One session for all requests so they reuse a keep-alive connection
+_SESSION = requests.Session()
+
 def main():
     print("🌐 Where Was Eye - HTTP API Example")
     print("=" * 50)
@@ -30,7 +33,8 @@ def main():
     endpoints = [
         ("GET", "/", "API information"),
         ("GET", "/health", "Health check"),
-        ("POST", "/get_location_at_time", "Get location at specific time")
+        ("POST", "/get_location_at_time", "Get location at specific time"),
+        ("POST", "/get_locations_at_times", "Get locations for a list of times")
     ]
     
     for method, endpoint, description in endpoints:
@@ -43,7 +47,7 @@ def main():
     print("-" * 30)
     
     try:
-        response = requests.get(f"{base_url}/health", timeout=5)
+        response = _SESSION.get(f"{base_url}/health", timeout=5)
         if response.status_code == 200:
             print("✅ Health check successful")
             print(f"Response: {response.json()}")
@@ -69,10 +73,9 @@ def main():
     }
     
     try:
-        response = requests.post(
+        response = _SESSION.post(
             f"{base_url}/get_location_at_time",
             json=payload,
-            headers={"Content-Type": "application/json"},
             timeout=10
         )
         
@@ -97,42 +100,38 @@ def main():
     print("\n3. Advanced Usage Example")
     print("-" * 30)
     
-    def query_location(year, month, day, hour, minute):
-        """Helper function to query location with error handling."""
-        payload = {
-            "year": year,
-            "month": month,
-            "day": day,
-            "hour": hour,
-            "minute": minute
-        }
+    def query_locations(times):
+        """Helper function to query several times in one request with error handling."""
+        payload = [
+            {"year": year, "month": month, "day": day, "hour": hour, "minute": minute}
+            for year, month, day, hour, minute in times
+        ]
         
         try:
-            response = requests.post(
-                f"{base_url}/get_location_at_time",
+            response = _SESSION.post(
+                f"{base_url}/get_locations_at_times",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=10
             )
             
             if response.status_code == 200:
                 return response.json()
             else:
-                return {"success": False, "error": f"HTTP {response.status_code}"}
+                return [{"success": False, "error": f"HTTP {response.status_code}"}] * len(times)
                 
         except requests.exceptions.RequestException as e:
-            return {"success": False, "error": str(e)}
+            return [{"success": False, "error": str(e)}] * len(times)
     
-    # Query multiple times
+    # Query multiple times in a single round trip
     times_to_query = [
         (2024, 8, 20, 12, 0),   # Noon
         (2024, 8, 20, 18, 30),  # Evening
         (2024, 8, 21, 9, 0),    # Next morning
     ]
     
-    for year, month, day, hour, minute in times_to_query:
-        result = query_location(year, month, day, hour, minute)
-        
+    results = query_locations(times_to_query)
+    
+    for (year, month, day, hour, minute), result in zip(times_to_query, results):
         time_str = f"{year}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}"
         
         if result["success"]:
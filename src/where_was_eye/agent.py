@@ -5,36 +5,172 @@ This module provides agent classes that integrate with various AI providers
 (OpenAI, Ollama) to answer questions about location history using the timeline database.
 """
 
-from typing import Any, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Mapping, Optional, Tuple, Union
 import os
+import re
+import sys
+import asyncio
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
+from types import MappingProxyType
 import json
 
-from where_was_eye.timeline_db import MyTimelineDB
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 
-# Optional imports for different AI providers
+from where_was_eye.timeline_db import MyTimelineDB, query_time_ns
+
+# Optional fast JSON codec for tool-call arguments and results
 try:
-    from openai import OpenAI as OpenAIClient
-    OPENAI_AVAILABLE = True
+    import orjson
 except ImportError:
-    OPENAI_AVAILABLE = False
+    orjson = None  # type: ignore[assignment]
 
-try:
+# orjson accepts str as well as bytes, so both decoders share a call signature
+_loads = orjson.loads if orjson else json.loads
+
+
+def _dumps(obj: Any) -> str:
+    """Serialize a tool result as compact JSON for the model."""
+    if orjson:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(",", ":"))
+
+# AI provider SDKs are optional and heavy to import, so they are only loaded
+# when a client for that provider is first created
+if TYPE_CHECKING:
     from ollama import Client as OllamaClient
-    OLLAMA_AVAILABLE = True
-except ImportError:
-    OLLAMA_AVAILABLE = False
+    from openai import OpenAI as OpenAIClient
+
+
+# Runs tool calls while the rest of a streamed completion is still arriving
+_TOOL_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="where_was_eye_tool")
+
 
+# Parsed timelines and provider clients are shared between agents. The timeline
+# is keyed by modification time so that an edited file gets re-parsed.
+@functools.lru_cache(maxsize=4)
+def _get_timeline_db(db_path: str, mtime: float) -> MyTimelineDB:
+    """Return a shared timeline database for a file at a given mtime."""
+    return MyTimelineDB(db_path)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_openai_client(api_key: str) -> "OpenAIClient":
+    """Return a shared OpenAI client (and its connection pool) for an API key."""
+    from openai import OpenAI as OpenAIClient
 
-@dataclass
+    return OpenAIClient(api_key=api_key)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_ollama_client(host: str) -> "OllamaClient":
+    """Return a shared Ollama client (and its connection pool) for a host."""
+    from ollama import Client as OllamaClient
+
+    return OllamaClient(host=host)
+
+
+# dataclass(slots=True) needs Python 3.10+; older interpreters fall back to __dict__
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class AgentConfig:
-    """Configuration for the AI agent."""
+    """Configuration for the AI agent (immutable, so it is safe to share and hash)."""
     provider: str = "openai"  # "openai" or "ollama"
     model: str = "gpt-4.1"
     temperature: float = 0.0
     timeline_db_path: Optional[str] = None
     openai_api_key: Optional[str] = None
     ollama_host: str = "http://localhost:11434"
+    time_bucket_minutes: int = 5  # tool lookups round minutes down to this bucket
+
+
+class LocationQuery(BaseModel):
+    """Validated arguments of the get_location_at_time tool."""
+    year: int
+    month: int = Field(ge=1, le=12)
+    day: int = Field(ge=1, le=31)
+    hour: int = Field(ge=0, le=23)
+    minute: int = Field(ge=0, le=59)
+
+
+# Built once; validating through the adapter avoids per-call schema setup
+_LOCATION_ADAPTER = TypeAdapter(LocationQuery)
+
+# A numeric date followed by a clock time, e.g. "2024-08-20 15:30" or
+# "2024/8/20 at 3:30 pm". Such questions need no tool-selection round trip.
+_DATE_TIME_RE = re.compile(
+    r"\b(?P<year>\d{4})[-/.](?P<month>\d{1,2})[-/.](?P<day>\d{1,2})"
+    r"\D{1,16}?"
+    r"(?P<hour>\d{1,2}):(?P<minute>\d{2})"
+    r"(?:\s*(?P<meridiem>[ap])\.?m\b\.?)?",
+    re.IGNORECASE,
+)
+
+# Any clock time ("14:00", "3 pm"); a question naming several describes a range
+_CLOCK_TIME_RE = re.compile(r"\b\d{1,2}(?::\d{2}\b|\s*[ap]\.?m\b)", re.IGNORECASE)
+
+
+def _match_location_query(question: str) -> Optional[LocationQuery]:
+    """
+    Extract an explicit date and time from a question.
+    
+    Returns:
+        The validated query, or None if the question does not contain exactly
+        one unambiguous numeric date-time that the timeline can be queried at;
+        such questions are left to the model's tool calls.
+    """
+    matches = list(_DATE_TIME_RE.finditer(question))
+    if len(matches) != 1 or len(_CLOCK_TIME_RE.findall(question)) != 1:
+        return None
+    
+    fields = matches[0].groupdict()
+    meridiem = fields.pop("meridiem")
+    values = {key: int(value) for key, value in fields.items()}
+    if meridiem:
+        if not 1 <= values["hour"] <= 12:
+            return None
+        values["hour"] = values["hour"] % 12 + (12 if meridiem.lower() == "p" else 0)
+    
+    try:
+        query = _LOCATION_ADAPTER.validate_python(values)
+        # Field ranges alone allow e.g. February 30 or years outside the timeline's range
+        query_time_ns(query.year, query.month, query.day, query.hour, query.minute)
+    except (ValidationError, ValueError):
+        return None
+    return query
+
+
+# Tool schema, built once and shared read-only. The SDKs copy mappings down to
+# the "parameters" level before encoding; the per-property schemas below that are
+# handed to json.dumps as-is, so they stay plain dicts.
+_TOOLS = (
+    MappingProxyType({
+        "type": "function",
+        "function": MappingProxyType({
+            "name": "get_location_at_time",
+            "description": "Retrieves the geographical location (latitude and longitude) at a specified time by browsing through Google timeline",
+            "parameters": MappingProxyType({
+                "type": "object",
+                "properties": {
+                    "year": {"type": "number", "description": "Year (e.g., 2024)"},
+                    "month": {"type": "number", "description": "Month (1-12)"},
+                    "day": {"type": "number", "description": "Day of month (1-31)"},
+                    "hour": {"type": "number", "description": "Hour (0-23)"},
+                    "minute": {
+                        "type": "number",
+                        "description": "Minute (0-59). Rounded down to a few-minute bucket, so an approximate minute is fine",
+                    },
+                },
+                "required": ("year", "month", "day", "hour", "minute"),
+                "additionalProperties": False,
+            }),
+            "strict": True,
+        }),
+    }),
+)
 
 
 class WhereWasEyeAgent:
@@ -51,28 +187,16 @@ When given the location, please try to give a location which is as exact as poss
 Instead of asking 'If you need a more precise address or further details, let me know' just share the precise address.
 """
 
-    TOOLS = [
-        {
-            "type": "function",
-            "function": {
-                "name": "get_location_at_time",
-                "description": "Retrieves the geographical location (latitude and longitude) at a specified time by browsing through Google timeline",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "year": {"type": "number", "description": "Year (e.g., 2024)"},
-                        "month": {"type": "number", "description": "Month (1-12)"},
-                        "day": {"type": "number", "description": "Day of month (1-31)"},
-                        "hour": {"type": "number", "description": "Hour (0-23)"},
-                        "minute": {"type": "number", "description": "Minute (0-59)"},
-                    },
-                    "required": ["year", "month", "day", "hour", "minute"],
-                    "additionalProperties": False,
-                },
-                "strict": True,
-            },
-        }
-    ]
+    # Built once per class and shared read-only by every run() call
+    SYSTEM_MESSAGE = MappingProxyType({"role": "system", "content": SYSTEM_PROMPT})
+
+    TOOLS = _TOOLS
+
+    def __init_subclass__(cls, **kwargs):
+        """Rebuild SYSTEM_MESSAGE so that a subclass's SYSTEM_PROMPT is the one sent."""
+        super().__init_subclass__(**kwargs)
+        if "SYSTEM_MESSAGE" not in cls.__dict__:
+            cls.SYSTEM_MESSAGE = MappingProxyType({"role": "system", "content": cls.SYSTEM_PROMPT})
 
     def __init__(self, config: Optional[AgentConfig] = None):
         """
@@ -82,7 +206,9 @@ Instead of asking 'If you need a more precise address or further details, let me
             config: Agent configuration. If None, uses default values.
         """
         self.config = config or AgentConfig()
-        self.timeline_db = None
+        self.timeline_db: MyTimelineDB
+        self._timeline_path: Optional[str] = None
+        self._timeline_mtime: Optional[float] = None
         self._client = None
         
         self._initialize_timeline_db()
@@ -97,26 +223,37 @@ Instead of asking 'If you need a more precise address or further details, let me
             if not db_path:
                 raise ValueError("Timeline database path not provided in config or environment")
         
-        self.timeline_db = MyTimelineDB(db_path)
+        self._timeline_path = os.path.abspath(db_path)
+        self._timeline_mtime = os.path.getmtime(self._timeline_path)
+        self.timeline_db = _get_timeline_db(self._timeline_path, self._timeline_mtime)
+    
+    def _timeline_changed(self) -> bool:
+        """Check whether the timeline file was modified since it was loaded."""
+        if self._timeline_path is None:
+            return False
+        try:
+            return os.path.getmtime(self._timeline_path) != self._timeline_mtime
+        except OSError:
+            return False
     
     def _initialize_ai_client(self):
         """Initialize the AI client based on provider."""
         if self.config.provider == "openai":
-            if not OPENAI_AVAILABLE:
-                raise ImportError("OpenAI client not available. Install with: pip install openai")
-            
             api_key = self.config.openai_api_key or os.environ.get("OPENAI_API_KEY")
             if not api_key:
                 raise ValueError("OpenAI API key not provided in config or environment")
             
-            self._client = OpenAIClient(api_key=api_key)
+            try:
+                self._client = _get_openai_client(api_key)
+            except ImportError:
+                raise ImportError("OpenAI client not available. Install with: pip install openai")
             
         elif self.config.provider == "ollama":
-            if not OLLAMA_AVAILABLE:
+            try:
+                self._client = _get_ollama_client(self.config.ollama_host)
+            except ImportError:
                 raise ImportError("Ollama client not available. Install with: pip install ollama")
             
-            self._client = OllamaClient(host=self.config.ollama_host)
-            
         else:
             raise ValueError(f"Unsupported provider: {self.config.provider}")
     
@@ -132,15 +269,27 @@ Instead of asking 'If you need a more precise address or further details, let me
             Tool execution result
         """
         if name == "get_location_at_time":
-            # Ensure all arguments are integers
-            for key in args:
-                if not isinstance(args[key], int):
-                    try:
-                        args[key] = int(args[key])
-                    except (ValueError, TypeError):
-                        raise ValueError(f"Invalid value for {key}: {args[key]}")
+            # Coerce to integers and range-check (e.g. month 1-12) in one step
+            try:
+                query = _LOCATION_ADAPTER.validate_python(args)
+            except ValidationError as e:
+                raise ValueError(f"Invalid arguments for {name}: {e}") from e
+            
+            # Bucket the minute so nearby questions share a cache entry
+            minute = query.minute
+            bucket = self.config.time_bucket_minutes
+            if bucket > 1:
+                minute -= minute % bucket
+            
+            key = (query.year, query.month, query.day, query.hour, minute)
+            location = self.timeline_db.get_location_at_time(*key)
+            
+            # Misses are cached too; revalidate them against the file (one stat
+            # call) so that newly exported history is not hidden by a stale miss
+            if location.get("latitude") is None and self._timeline_changed():
+                self._initialize_timeline_db()
+                location = self.timeline_db.get_location_at_time(*key)
             
-            location = self.timeline_db.get_location_at_time(**args)
             return location
             
         raise ValueError(f"Unknown tool: {name}")
@@ -155,95 +304,224 @@ Instead of asking 'If you need a more precise address or further details, let me
         Returns:
             The AI's response with location information
         """
-        messages = [
-            {"role": "system", "content": self.SYSTEM_PROMPT},
-            {"role": "user", "content": question},
-        ]
+        return "".join(self.run_stream(question))
+    
+    def run_stream(self, question: str) -> Iterator[str]:
+        """
+        Process a question about location history, yielding the answer as it is generated.
+        
+        Args:
+            question: The question to answer
+            
+        Yields:
+            Chunks of the AI's response text
+        """
+        messages: List[Mapping[str, Any]] = [self.SYSTEM_MESSAGE, {"role": "user", "content": question}]
+        
+        # Fast path: the question already names the time, so look it up directly
+        # and let the model only phrase the answer (one round trip instead of two)
+        use_tools = True
+        query = _match_location_query(question)
+        if query is not None:
+            tool_result = self._run_tool("get_location_at_time", query.model_dump())
+            messages.append({
+                "role": "system",
+                "content": f"get_location_at_time({_dumps(query.model_dump())}) returned: {_dumps(tool_result)}",
+            })
+            use_tools = False
         
         if self.config.provider == "openai":
-            return self._run_openai(messages)
+            yield from self._stream_openai(messages, use_tools=use_tools)
         elif self.config.provider == "ollama":
-            return self._run_ollama(messages)
+            yield from self._stream_ollama(messages, use_tools=use_tools)
         else:
             raise ValueError(f"Unsupported provider: {self.config.provider}")
     
-    def _run_openai(self, messages: List[Dict]) -> str:
-        """Run the OpenAI-based agent."""
-        response = self._client.chat.completions.create(
+    async def run_async(self, question: str) -> str:
+        """
+        Async variant of run() for use inside an event loop (e.g. a FastAPI app).
+        
+        The provider SDK calls and tool-argument decoding are blocking, so the
+        question is answered on the loop's default executor instead of the loop.
+        
+        Args:
+            question: The question to answer
+            
+        Returns:
+            The AI's response with location information
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.run, question)
+    
+    def _stream_openai(self, messages: List[Mapping[str, Any]], use_tools: bool = True) -> Iterator[str]:
+        """Run the OpenAI-based agent, yielding the answer text."""
+        # The API rejects an empty tools list, so leave the argument out entirely
+        tools = {"tools": self.TOOLS} if use_tools else {}
+        stream = self._client.chat.completions.create(
+            model=self.config.model,
+            messages=messages,
+            temperature=self.config.temperature,
+            stream=True,
+            **tools,
+        )
+        
+        if not use_tools:
+            # No tool call can follow, so the answer is passed through as it arrives
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            return
+        
+        content, tool_calls, futures = self._consume_openai_stream(stream)
+        
+        if not tool_calls:
+            if content:
+                yield content
+            return
+        
+        # Grow the one message list in place rather than concatenating copies
+        messages.append({"role": "assistant", "content": content or None, "tool_calls": tool_calls})
+        messages.extend(
+            {
+                "role": "tool",
+                "tool_call_id": tool_call["id"],
+                "content": _dumps(future.result())
+            }
+            for tool_call, future in zip(tool_calls, futures)
+        )
+        
+        # Send results back to model and pass the answer through as it arrives
+        final_stream = self._client.chat.completions.create(
             model=self.config.model,
             messages=messages,
             tools=self.TOOLS,
             temperature=self.config.temperature,
+            stream=True,
         )
+        for chunk in final_stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    def _consume_openai_stream(self, stream) -> Tuple[str, List[Dict], List[Future]]:
+        """
+        Collect a streamed OpenAI completion.
         
-        message = response.choices[0].message
+        Each tool call is submitted to the tool executor as soon as its arguments
+        are complete (a later call starts or the choice finishes), so the database
+        lookup overlaps with the remainder of the stream.
         
-        if message.tool_calls:
-            tool_call = message.tool_calls[0]
-            tool_name = tool_call.function.name
-            tool_args = json.loads(tool_call.function.arguments)
+        Returns:
+            Tuple of (content, tool_calls, futures) where tool_calls are assistant
+            message entries and futures hold the matching tool results.
+        """
+        content_parts = []
+        # stream index -> (id, name, argument fragments)
+        calls: Dict[int, Tuple[Optional[str], Optional[str], List[str]]] = {}
+        futures: Dict[int, Future] = {}
+        
+        def dispatch_pending():
+            for index, (_, name, arg_parts) in calls.items():
+                if index not in futures:
+                    futures[index] = _TOOL_EXECUTOR.submit(
+                        self._run_tool, name, _loads("".join(arg_parts) or "{}")
+                    )
+        
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            delta = choice.delta
             
-            tool_result = self._run_tool(tool_name, tool_args)
+            if delta.content:
+                content_parts.append(delta.content)
             
-            # Send result back to model
-            final_response = self._client.chat.completions.create(
-                model=self.config.model,
-                messages=messages + [message] + [
-                    {
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "content": str(tool_result)
-                    }
-                ],
-                tools=self.TOOLS,
-                temperature=self.config.temperature,
-            )
+            for fragment in delta.tool_calls or ():
+                if fragment.index not in calls:
+                    # A new call starting means all earlier ones are complete
+                    dispatch_pending()
+                    name = fragment.function.name if fragment.function else None
+                    calls[fragment.index] = (fragment.id, name, [])
+                if fragment.function and fragment.function.arguments:
+                    calls[fragment.index][2].append(fragment.function.arguments)
             
-            return final_response.choices[0].message.content
-        else:
-            return message.content
+            if choice.finish_reason:
+                dispatch_pending()
+        
+        dispatch_pending()
+        
+        tool_calls = [
+            {
+                "id": call_id,
+                "type": "function",
+                "function": {"name": name, "arguments": "".join(arg_parts)},
+            }
+            for _, (call_id, name, arg_parts) in sorted(calls.items())
+        ]
+        return "".join(content_parts), tool_calls, [futures[index] for index in sorted(calls)]
     
-    def _run_ollama(self, messages: List[Dict]) -> str:
-        """Run the Ollama-based agent."""
-        # Convert messages to Ollama format
-        ollama_messages = []
+    def _stream_ollama(self, messages: List[Mapping[str, Any]], use_tools: bool = True) -> Iterator[str]:
+        """Run the Ollama-based agent, yielding the answer text."""
+        # Convert messages to Ollama format: system content is folded into the
+        # first user message (joined once) rather than sent as its own role
+        system_parts = []
+        ollama_messages: List[Mapping[str, Any]] = []
         for msg in messages:
             if msg["role"] == "system":
-                # Ollama doesn't have system role, so we prepend to first user message
-                if ollama_messages and ollama_messages[-1]["role"] == "user":
-                    ollama_messages[-1]["content"] = msg["content"] + "\n\n" + ollama_messages[-1]["content"]
-                else:
-                    # If no user message yet, create one with system content
-                    ollama_messages.append({"role": "user", "content": msg["content"]})
+                system_parts.append(msg["content"])
             else:
                 ollama_messages.append(msg)
         
-        response = self._client.chat(
+        if system_parts:
+            if ollama_messages and ollama_messages[0]["role"] == "user":
+                system_parts.append(ollama_messages[0]["content"])
+                ollama_messages[0] = {"role": "user", "content": "\n\n".join(system_parts)}
+            else:
+                # If no user message yet, create one with system content
+                ollama_messages.insert(0, {"role": "user", "content": "\n\n".join(system_parts)})
+        
+        content_parts = []
+        tool_calls = []
+        for chunk in self._client.chat(
             model=self.config.model,
             messages=ollama_messages,
-            tools=self.TOOLS,
+            tools=self.TOOLS if use_tools else None,
             options={"temperature": self.config.temperature},
+            stream=True,
+        ):
+            if chunk.message.content:
+                if use_tools:
+                    # Held back: text ahead of a tool call is not part of the answer
+                    content_parts.append(chunk.message.content)
+                else:
+                    yield chunk.message.content
+            if chunk.message.tool_calls:
+                tool_calls.extend(chunk.message.tool_calls)
+        
+        if not tool_calls:
+            if content_parts:
+                yield "".join(content_parts)
+            return
+        
+        ollama_messages.append(
+            {"role": "assistant", "content": "".join(content_parts), "tool_calls": tool_calls}
+        )
+        ollama_messages.extend(
+            {
+                "role": "tool",
+                "content": _dumps(self._run_tool(tool_call.function.name, tool_call.function.arguments))
+            }
+            for tool_call in tool_calls
         )
         
-        if response.message.tool_calls:
-            tool_call = response.message.tool_calls[0]
-            tool_name = tool_call.function.name
-            tool_args = tool_call.function.arguments
-            
-            tool_result = self._run_tool(tool_name, tool_args)
-            
-            final_response = self._client.chat(
-                model=self.config.model,
-                messages=ollama_messages + [response.message] + [
-                    {"role": "tool", "content": str(tool_result)}
-                ],
-                tools=self.TOOLS,
-                options={"temperature": self.config.temperature},
-            )
-            
-            return final_response.message.content
-        else:
-            return response.message.content
+        for chunk in self._client.chat(
+            model=self.config.model,
+            messages=ollama_messages,
+            tools=self.TOOLS,
+            options={"temperature": self.config.temperature},
+            stream=True,
+        ):
+            if chunk.message.content:
+                yield chunk.message.content
 
 
 # Simple factory function for convenience
@@ -5,17 +5,29 @@ This module provides FastAPI-based HTTP servers for exposing timeline query func
 as REST APIs and MCP (Model Context Protocol) servers.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
 import os
 import logging
+import threading
 
 from where_was_eye.timeline_db import MyTimelineDB
 
 logger = logging.getLogger(__name__)
 
+# Builds timeline databases off the event loop so the server can answer health checks meanwhile
+_LOAD_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="where_was_eye_load")
+
+# A lookup takes microseconds, far less than a threadpool hop (~100 us), so
+# requests run inline; only batches larger than this are moved off the event loop
+INLINE_BATCH_MAX = 64
+
 
 class TimeRequest(BaseModel):
     """Request model for time-based location queries."""
@@ -34,6 +46,20 @@ class LocationResponse(BaseModel):
     error: Optional[str] = None
 
 
+class HealthResponse(BaseModel):
+    """Response model for the health check."""
+    status: str
+    service: str
+
+
+class MCPLocationResponse(BaseModel):
+    """Response model for MCP location queries; unset fields are omitted."""
+    success: bool
+    data: Optional[Dict[str, Optional[float]]] = None
+    metadata: Optional[Dict[str, str]] = None
+    error: Optional[str] = None
+
+
 class ServerConfig:
     """Configuration for the HTTP server."""
     def __init__(
@@ -51,6 +77,39 @@ class ServerConfig:
         self.enable_mcp = enable_mcp
 
 
+class _LazyTimelineDB:
+    """
+    MyTimelineDB that is built on a background thread.
+    
+    Loading starts at application startup, or on first use when the app runs
+    without a lifespan (e.g. a bare TestClient); requests await the result.
+    """
+    
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._future: Optional[Future] = None
+        self._lock = threading.Lock()
+    
+    def start(self) -> Future:
+        """Start loading if it has not started yet and return the pending result."""
+        with self._lock:
+            if self._future is None:
+                logger.info("Loading timeline database from %s in the background", self.db_path)
+                self._future = _LOAD_EXECUTOR.submit(MyTimelineDB, self.db_path)
+            return self._future
+    
+    def status(self) -> str:
+        """Return "loading", "ready" or "error" (starting the load if needed)."""
+        future = self.start()
+        if not future.done():
+            return "loading"
+        return "error" if future.exception() is not None else "ready"
+    
+    async def get(self) -> MyTimelineDB:
+        """Wait for the database without blocking the event loop."""
+        return await asyncio.wrap_future(self.start())
+
+
 def create_app(config: Optional[ServerConfig] = None) -> FastAPI:
     """
     Create and configure the FastAPI application.
@@ -65,11 +124,23 @@ def create_app(config: Optional[ServerConfig] = None) -> FastAPI:
     
     if not config.timeline_db_path:
         raise ValueError("Timeline database path not provided in config or environment")
+    if not os.path.isfile(config.timeline_db_path):
+        raise FileNotFoundError(f"Timeline database not found: {config.timeline_db_path}")
+    
+    # The database is parsed (or loaded from cache) in the background, so the
+    # server accepts connections and answers /health while it is loading
+    timeline = _LazyTimelineDB(config.timeline_db_path)
+    
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        timeline.start()
+        yield
     
     app = FastAPI(
         title="Where Was Eye API",
         version="1.0.0",
         description="API for querying Google Timeline location history data",
+        lifespan=lifespan,
     )
     
     # Add CORS middleware
@@ -81,8 +152,13 @@ def create_app(config: Optional[ServerConfig] = None) -> FastAPI:
         allow_headers=["*"],
     )
     
-    # Initialize timeline database
-    timeline_db = MyTimelineDB(config.timeline_db_path)
+    async def get_timeline_db() -> MyTimelineDB:
+        """Wait for the timeline database, mapping load failures to 503."""
+        try:
+            return await timeline.get()
+        except Exception as e:
+            logger.error(f"Timeline database failed to load: {e}")
+            raise HTTPException(status_code=503, detail=f"Timeline database unavailable: {e}")
     
     @app.get("/")
     async def root():
@@ -93,14 +169,19 @@ def create_app(config: Optional[ServerConfig] = None) -> FastAPI:
             "description": "API for querying Google Timeline location history",
             "endpoints": {
                 "/get_location_at_time": "POST - Get location at specific time",
+                "/get_locations_at_times": "POST - Get locations for a list of times",
                 "/health": "GET - Health check"
             }
         }
     
-    @app.get("/health")
-    async def health_check():
-        """Health check endpoint."""
-        return {"status": "healthy", "service": "where_was_eye"}
+    @app.get("/health", response_model=HealthResponse, responses={503: {"model": HealthResponse}})
+    async def health_check(response: Response):
+        """Health check endpoint; 503 until the timeline database has loaded."""
+        status = timeline.status()
+        if status != "ready":
+            response.status_code = 503
+            return HealthResponse(status=status, service="where_was_eye")
+        return HealthResponse(status="healthy", service="where_was_eye")
     
     @app.post("/get_location_at_time", response_model=LocationResponse)
     async def get_location_at_time(request: TimeRequest):
@@ -113,41 +194,67 @@ def create_app(config: Optional[ServerConfig] = None) -> FastAPI:
         Returns:
             LocationResponse with latitude and longitude, or error
         """
-        try:
-            location = timeline_db.get_location_at_time(
-                year=request.year,
-                month=request.month,
-                day=request.day,
-                hour=request.hour,
-                minute=request.minute
-            )
+        return _lookup_location(await get_timeline_db(), request)
+    
+    @app.post("/get_locations_at_times", response_model=List[LocationResponse])
+    async def get_locations_at_times(requests: List[TimeRequest]):
+        """
+        Get locations for several times in a single request.
+        
+        Args:
+            requests: List of TimeRequest objects
             
-            if location and "latitude" in location and "longitude" in location:
-                return LocationResponse(
-                    latitude=location.get("latitude"),
-                    longitude=location.get("longitude")
-                )
-            else:
-                return LocationResponse(
-                    success=False,
-                    error="Location not found for the specified time"
-                )
-                
-        except Exception as e:
-            logger.error(f"Error getting location: {e}")
-            return LocationResponse(
-                success=False,
-                error=f"Internal server error: {str(e)}"
-            )
+        Returns:
+            List of LocationResponse objects, in request order
+        """
+        timeline_db = await get_timeline_db()
+        if len(requests) > INLINE_BATCH_MAX:
+            return await run_in_threadpool(_lookup_locations, timeline_db, requests)
+        return _lookup_locations(timeline_db, requests)
     
     # MCP-specific endpoints if enabled
     if config.enable_mcp:
-        _setup_mcp_endpoints(app, timeline_db)
+        _setup_mcp_endpoints(app, timeline)
     
     return app
 
 
-def _setup_mcp_endpoints(app: FastAPI, timeline_db: MyTimelineDB):
+def _lookup_location(timeline_db: MyTimelineDB, request: TimeRequest) -> LocationResponse:
+    """Query the timeline for one TimeRequest and wrap the result in a LocationResponse."""
+    try:
+        location = timeline_db.get_location_at_time(
+            year=request.year,
+            month=request.month,
+            day=request.day,
+            hour=request.hour,
+            minute=request.minute
+        )
+        
+        if location and "latitude" in location and "longitude" in location:
+            return LocationResponse(
+                latitude=location.get("latitude"),
+                longitude=location.get("longitude")
+            )
+        else:
+            return LocationResponse(
+                success=False,
+                error="Location not found for the specified time"
+            )
+            
+    except Exception as e:
+        logger.error(f"Error getting location: {e}")
+        return LocationResponse(
+            success=False,
+            error=f"Internal server error: {str(e)}"
+        )
+
+
+def _lookup_locations(timeline_db: MyTimelineDB, requests: List[TimeRequest]) -> List[LocationResponse]:
+    """Answer a batch of TimeRequests, in order."""
+    return [_lookup_location(timeline_db, request) for request in requests]
+
+
+def _setup_mcp_endpoints(app: FastAPI, timeline: _LazyTimelineDB):
     """Setup MCP (Model Context Protocol) specific endpoints."""
     
     class MCPTimeRequest(BaseModel):
@@ -157,13 +264,14 @@ def _setup_mcp_endpoints(app: FastAPI, timeline_db: MyTimelineDB):
         hour: int
         minute: int
     
-    @app.post("/mcp/get_location")
+    @app.post("/mcp/get_location", response_model=MCPLocationResponse, response_model_exclude_unset=True)
     async def mcp_get_location(request: MCPTimeRequest):
         """
         MCP-compatible endpoint for getting location.
         Returns data in MCP-friendly format.
         """
         try:
+            timeline_db = await timeline.get()
             location = timeline_db.get_location_at_time(
                 year=request.year,
                 month=request.month,
@@ -172,21 +280,21 @@ def _setup_mcp_endpoints(app: FastAPI, timeline_db: MyTimelineDB):
                 minute=request.minute
             )
             
-            return {
-                "success": True,
-                "data": location,
-                "metadata": {
+            return MCPLocationResponse(
+                success=True,
+                data=location,
+                metadata={
                     "source": "google_timeline",
                     "query_time": f"{request.year}-{request.month:02d}-{request.day:02d} {request.hour:02d}:{request.minute:02d}"
                 }
-            }
+            )
             
         except Exception as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "data": None
-            }
+            return MCPLocationResponse(
+                success=False,
+                error=str(e),
+                data=None
+            )
 
 
 # Simple standalone server runner
@@ -221,8 +329,11 @@ def run_server(
     print("  GET  /          - API information")
     print("  GET  /health    - Health check")
     print("  POST /get_location_at_time - Get location at specific time")
+    print("  POST /get_locations_at_times - Get locations for a list of times")
     
-    uvicorn.run(app, host=host, port=port, reload=reload)
+    # "auto" picks uvloop and httptools when installed (the "fast" extra),
+    # and falls back to asyncio and h11 otherwise, e.g. on Windows
+    uvicorn.run(app, host=host, port=port, reload=reload, loop="auto", http="auto")
 
 
 if __name__ == "__main__":
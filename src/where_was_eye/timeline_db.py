@@ -7,22 +7,34 @@ It handles the JSON format from Google Takeout and provides efficient time-based
 
 import json
 import os
-import pickle
 import re
 import ast
+import functools
 import logging
-from datetime import datetime
-from typing import Dict, Optional, Tuple, List, Any
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional, Tuple, List, Any, Union
 import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
 # Optional dependencies for enhanced parsing
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
 try:
     import json5
 except ImportError:
     json5 = None
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 try:
     from dateutil import parser as dateutil_parser
 except ImportError:
@@ -30,6 +42,21 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Bulk decoder for Takeout files; both accept the raw bytes of the file
+_json_loads = orjson.loads if orjson else json.loads
+
+# ijson's C backend streams as fast as a bulk decode; its pure-Python backends
+# are slower, so they are only used for files of at least this many bytes
+STREAM_PARSE_MIN_BYTES = 256 * 1024 * 1024
+
+# Fallback extraction (regex scan, loose date parsing) is CPU-bound pure Python;
+# below this many entries process start-up costs more than it saves
+PARALLEL_FALLBACK_MIN = 20000
+PARALLEL_CHUNK_SIZE = 2000
+
+START_KEYS = ('startTime', 'start_time', 'start')
+END_KEYS = ('endTime', 'end_time', 'end')
+
 # Regex patterns for parsing timeline data
 ISO_RE = re.compile(
     r"\d{4}-\d{2}-\d{2}T"
@@ -45,17 +72,71 @@ KEYVAL_RE = re.compile(
         )""",
     re.IGNORECASE | re.VERBOSE
 )
+# Lower-cased keys KEYVAL_RE accepts, for matching against parsed mappings
+KEYVAL_KEYS = frozenset(('starttime', 'endtime', 'start_time', 'end_time', 'start', 'end'))
 
 
 def parse_geo_uri(geo_string):
+    if isinstance(geo_string, dict):
+        return {"latitude": float(geo_string["latitude"]), "longitude": float(geo_string["longitude"])}
     coords = geo_string.split(':')[1].split(',')
     return {"latitude": float(coords[0]), "longitude": float(coords[1])}
 
+
+# For turning query fields into int64 ns without building a pd.Timestamp
+_EPOCH = datetime(1970, 1, 1)
+_ONE_US = timedelta(microseconds=1)
+_NS_BOUNDS = (np.iinfo(np.int64).min + 1, np.iinfo(np.int64).max)
+
+# Entry kind codes stored alongside the coordinates
+KIND_NONE, KIND_VISIT, KIND_ACTIVITY = 0, 1, 2
+
+# Memoized get_location_at_time results kept per MyTimelineDB; repeated queries
+# (batches, MCP clients re-asking) tend to hit the same minutes
+LOOKUP_CACHE_SIZE = 4096
+
+# Per-interval arrays persisted by MyTimelineDB, one .npy file each
+_CACHE_ARRAYS = ("left_ns", "right_ns", "max_right_ns", "lat", "lon", "kind")
+# Bumped whenever the meaning of the cached arrays changes, so older caches are
+# rebuilt rather than reused (2: rows without a location are no longer stored;
+# 3: geo: start/end values are no longer mistaken for interval times)
+CACHE_FORMAT_VERSION = "3"
+# Files of earlier cache layouts, removed once the current layout is written
+_LEGACY_CACHE_FILES = ("all_data.pkl", "intervals.npz", "locations.npz")
+
+
+def entry_location(item: Dict) -> Tuple[float, float, int]:
+    """
+    Return (latitude, longitude, kind) for a timeline entry.
+    
+    Visits use the top candidate's place location and activities their start
+    point; anything else, or a location that cannot be parsed, yields NaN
+    coordinates.
+    """
+    try:
+        if 'visit' in item:
+            kind, geo = KIND_VISIT, item['visit']['topCandidate']['placeLocation']
+        elif 'activity' in item:
+            # TODO: better handling of activities by relating to start/end times
+            kind, geo = KIND_ACTIVITY, item['activity']['start']
+        else:
+            return np.nan, np.nan, KIND_NONE
+        location = parse_geo_uri(geo)
+    except (AttributeError, KeyError, IndexError, TypeError, ValueError):
+        # e.g. a null, list or numeric placeLocation
+        return np.nan, np.nan, KIND_NONE
+    return location["latitude"], location["longitude"], kind
+
 def parse_loose_mapping(text: str) -> Optional[Dict]:
     """Parse JSON-like text with various formatting options."""
+    # Every accepted syntax starts with a bracket (or a JSON5 comment); plain
+    # text would otherwise make each parser below raise in turn
+    if not text.lstrip().startswith(('{', '[', '/')):
+        return None
+    
     # Try strict JSON
     try:
-        return json.loads(text)
+        return _json_loads(text)
     except Exception:
         pass
     
@@ -79,7 +160,13 @@ def parse_dt_loose(s: str) -> Optional[datetime]:
     """Parse datetime strings with various formats."""
     if not isinstance(s, str):
         return None
-    
+    return _parse_dt_cached(s)
+
+
+# Datetimes are immutable, so repeated strings can share one parse
+@functools.lru_cache(maxsize=4096)
+def _parse_dt_cached(s: str) -> Optional[datetime]:
+    """Memoized body of parse_dt_loose."""
     t = s.strip()
     # Handle 'Z' -> '+00:00' for fromisoformat compatibility
     if t.endswith('Z'):
@@ -99,47 +186,106 @@ def parse_dt_loose(s: str) -> Optional[datetime]:
     return None
 
 
-def extract_interval(text: str) -> Tuple[Optional[datetime], Optional[datetime], Dict]:
+def _looks_like_time(value: str) -> bool:
+    """Cheap pre-check that a start/end value is a timestamp (e.g. not "geo:...")."""
+    return value.lstrip()[:1].isdigit()
+
+
+def _first_str(obj: Dict, keys: Tuple[str, ...]) -> Optional[str]:
+    """Return the first timestamp-like string value found under one of the given keys."""
+    for k in keys:
+        v = obj.get(k)
+        if isinstance(v, str) and _looks_like_time(v):
+            return v
+    return None
+
+
+def _interval_raw_from_mapping(obj: Dict) -> Tuple[Optional[str], Optional[str]]:
+    """Read raw start/end strings from the common top-level key variants."""
+    return _first_str(obj, START_KEYS), _first_str(obj, END_KEYS)
+
+
+def _iter_str_items(obj: Any) -> Iterator[Tuple[Optional[str], str]]:
+    """Yield (key, value) for every string value of a parsed JSON tree, in document order."""
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            if isinstance(v, str):
+                yield k, v
+            else:
+                yield from _iter_str_items(v)
+    elif isinstance(obj, list):
+        for v in obj:
+            if isinstance(v, str):
+                yield None, v
+            else:
+                yield from _iter_str_items(v)
+
+
+def extract_interval_raw(src: Union[str, Dict]) -> Tuple[Optional[str], Optional[str]]:
     """
-    Extract start and end datetime from timeline entry text.
+    Find the raw start and end strings of a timeline entry, without parsing them.
+    
+    Args:
+        src: Entry text, or an already-parsed entry (used as-is, never re-serialized)
     
     Returns:
-        Tuple of (start_dt, end_dt, meta) where meta includes raw strings found.
+        Tuple of (start_raw, end_raw); either is None when not found
     """
     start_raw = end_raw = None
 
     # 1) Try to parse as mapping
-    obj = parse_loose_mapping(text)
+    obj: Optional[Dict]
+    if isinstance(src, dict):
+        obj, text = src, None
+    else:
+        obj, text = parse_loose_mapping(src), src
     if isinstance(obj, dict):
-        # Common key variants
-        for k in ['startTime', 'start_time', 'start']:
-            if k in obj and isinstance(obj[k], str):
-                start_raw = obj[k]
-                break
-        for k in ['endTime', 'end_time', 'end']:
-            if k in obj and isinstance(obj[k], str):
-                end_raw = obj[k]
-                break
-
-    # 2) If not found, try key/value regex
+        start_raw, end_raw = _interval_raw_from_mapping(obj)
+
+    # 2) If not found, try key/value regex (or the same keys anywhere in the mapping).
+    # Values that are not timestamps are skipped: an activity's "start" is often
+    # its geo: point, while the times sit in nested segments
     if start_raw is None or end_raw is None:
         found = {}
-        for m in KEYVAL_RE.finditer(text):
-            key = m.group('key').lower()
-            val = m.group('val')
-            found[key] = val
+        if text is not None:
+            for m in KEYVAL_RE.finditer(text):
+                key = m.group('key').lower()
+                val = m.group('val')
+                if _looks_like_time(val):
+                    found[key] = val
+        else:
+            for key, val in _iter_str_items(obj):
+                if key is not None and key.lower() in KEYVAL_KEYS and _looks_like_time(val):
+                    found[key.lower()] = val
         start_raw = start_raw or found.get('starttime') or found.get('start_time') or found.get('start')
         end_raw = end_raw or found.get('endtime') or found.get('end_time') or found.get('end')
 
     # 3) If still missing, pull first two ISO timestamps in order
     if start_raw is None or end_raw is None:
-        hits = ISO_RE.findall(text)
+        if text is not None:
+            hits = ISO_RE.findall(text)
+        else:
+            hits = [hit for _, val in _iter_str_items(obj) for hit in ISO_RE.findall(val)]
         if hits:
             if start_raw is None and len(hits) >= 1:
                 start_raw = hits[0]
             if end_raw is None and len(hits) >= 2:
                 end_raw = hits[1]
 
+    return start_raw, end_raw
+
+
+def extract_interval(src: Union[str, Dict]) -> Tuple[Optional[datetime], Optional[datetime], Dict]:
+    """
+    Extract start and end datetime from a timeline entry.
+    
+    Args:
+        src: Entry text, or an already-parsed entry (used as-is, never re-serialized)
+    
+    Returns:
+        Tuple of (start_dt, end_dt, meta) where meta includes raw strings found.
+    """
+    start_raw, end_raw = extract_interval_raw(src)
     start_dt = parse_dt_loose(start_raw) if start_raw else None
     end_dt = parse_dt_loose(end_raw) if end_raw else None
 
@@ -147,41 +293,201 @@ def extract_interval(text: str) -> Tuple[Optional[datetime], Optional[datetime],
     return start_dt, end_dt, meta
 
 
+def extract_interval_from_obj(obj: Dict) -> Tuple[Optional[datetime], Optional[datetime], Dict]:
+    """
+    Extract start and end datetime from an already-parsed timeline entry.
+    
+    Equivalent to extract_interval(obj).
+    
+    Returns:
+        Tuple of (start_dt, end_dt, meta) where meta includes raw strings found.
+    """
+    return extract_interval(obj)
+
+
+def _top_level_raw(item: Dict) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Return the top-level start/end strings of a timeline entry.
+    
+    Google Takeout entries carry startTime/endTime strings, which are tried
+    first; the other START_KEYS/END_KEYS spellings are checked next. The strings
+    are returned as-is and parsed later in bulk by to_utc_naive_array. Entries
+    lacking either one yield (None, None).
+    """
+    try:
+        start_raw, end_raw = item['startTime'], item['endTime']
+        if isinstance(start_raw, str) and isinstance(end_raw, str):
+            return start_raw, end_raw
+    except KeyError:
+        pass
+    
+    start_raw, end_raw = _interval_raw_from_mapping(item)
+    if start_raw is None or end_raw is None:
+        return None, None
+    return start_raw, end_raw
+
+
+def _fallback_raw_interval(item: Dict) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Return raw start/end strings via extract_interval_raw and its fallbacks.
+    
+    The strings are not parsed here; to_utc_naive_array parses them with the
+    rest and turns any that are not valid timestamps into NaT.
+    """
+    start_raw, end_raw = extract_interval_raw(item)
+    if start_raw is None or end_raw is None:
+        return None, None
+    return start_raw, end_raw
+
+
+def _extract_raw_chunk(items: List[Dict]) -> List[Tuple[Optional[str], Optional[str]]]:
+    """Run the fallback extraction over one chunk; module-level so workers can unpickle it."""
+    return [_fallback_raw_interval(item) for item in items]
+
+
+def extract_raw_intervals(items: List[Dict]) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Run the fallback extraction over many entries, in worker processes when worthwhile.
+    
+    Entries are handed to a ProcessPoolExecutor in chunks of PARALLEL_CHUNK_SIZE
+    once there are at least PARALLEL_FALLBACK_MIN of them, using at most one worker
+    per CPU and per chunk; smaller inputs, or a pool that cannot be started, are
+    handled in-process.
+    
+    Args:
+        items: Timeline entries lacking top-level startTime/endTime strings
+    
+    Returns:
+        (start_raw, end_raw) per entry, in input order; (None, None) where no
+        interval could be extracted
+    """
+    n_cpus = os.cpu_count() or 1
+    if len(items) < PARALLEL_FALLBACK_MIN or n_cpus < 2:
+        return _extract_raw_chunk(items)
+    
+    chunks = [items[i:i + PARALLEL_CHUNK_SIZE] for i in range(0, len(items), PARALLEL_CHUNK_SIZE)]
+    results: List[Tuple[Optional[str], Optional[str]]] = []
+    try:
+        # No more workers than chunks: each extra process only adds spawn cost
+        # Never fork: the server builds the database on a worker thread, and forking
+        # a multi-threaded process can deadlock the children
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        with ProcessPoolExecutor(max_workers=min(n_cpus, len(chunks)),
+                                 mp_context=multiprocessing.get_context(start_method)) as executor:
+            for part in tqdm(executor.map(_extract_raw_chunk, chunks), total=len(chunks),
+                             desc="Extracting non-standard entries"):
+                results.extend(part)
+    except (OSError, RuntimeError) as e:
+        # e.g. BrokenProcessPool, or spawn from an unguarded __main__
+        logger.warning(f"Parallel extraction unavailable ({e}), falling back to a single process")
+        return _extract_raw_chunk(items)
+    return results
+
+
+def iter_timeline_entries(path: str) -> Iterator[Any]:
+    """
+    Yield the entries of a Takeout timeline file (a top-level JSON array).
+    
+    With ijson installed the file is parsed incrementally, so only one entry is
+    materialized at a time (always with its C backend, otherwise from
+    STREAM_PARSE_MIN_BYTES up); anything else is decoded in one go.
+    """
+    with open(path, 'rb') as fp:
+        stream = ijson is not None and (
+            ijson.backend == 'yajl2_c' or os.fstat(fp.fileno()).st_size >= STREAM_PARSE_MIN_BYTES
+        )
+        if not stream:
+            yield from _json_loads(fp.read())
+            return
+        try:
+            yield from ijson.items(fp, 'item', use_float=True)
+        except ijson.JSONError as e:
+            # Keep the json/orjson contract: malformed files raise json.JSONDecodeError
+            raise json.JSONDecodeError(f"Invalid timeline JSON: {e}", "", fp.tell()) from e
+
+
 def to_utc_naive(x, assume_utc_for_naive=True) -> pd.Timestamp:
-    """Convert timestamp to UTC-naive format."""
+    """
+    Convert a single timestamp to UTC-naive format (the per-query path).
+    
+    Bulk conversion during builds goes through to_utc_naive_array instead.
+    """
     ts = pd.Timestamp(x)
     if ts.tz is None:
-        # Option A: treat naive as UTC for consistency
-        return ts.tz_localize('UTC').tz_localize(None) if assume_utc_for_naive else ts
+        # Naive values are already read as UTC; localizing and stripping again is a no-op
+        return ts
     # Convert tz-aware to UTC, then drop tz
     return ts.tz_convert('UTC').tz_localize(None)
 
 
-def find_interval_or_nearest(time_idx: pd.IntervalIndex, t) -> Tuple[int, bool]:
+def to_utc_naive_array(raws: List[str]) -> pd.DatetimeIndex:
+    """
+    Vectorized to_utc_naive for a list of ISO-8601 strings.
+    
+    Naive values are treated as UTC; values that cannot be parsed become NaT.
+    """
+    idx = pd.to_datetime(raws, utc=True, format='ISO8601', errors='coerce')
+    # Pin nanosecond resolution so .asi8 always means int64 ns
+    return idx.tz_convert(None).as_unit('ns')
+
+
+def query_time_ns(year: int, month: int, day: int, hour: int, minute: int) -> int:
+    """
+    Convert UTC date-time fields to int64 nanoseconds since the epoch.
+    
+    Raises:
+        ValueError: If the fields do not form a valid date-time (e.g. February 30),
+            or the time lies outside the nanosecond range (years 1677-2262)
+    """
+    # datetime() validates the fields like pd.Timestamp would, at a fraction of the cost
+    t_ns = (datetime(year, month, day, hour, minute) - _EPOCH) // _ONE_US * 1000
+    if not _NS_BOUNDS[0] <= t_ns <= _NS_BOUNDS[1]:
+        raise ValueError(f"Time out of the supported range: {year}-{month:02d}-{day:02d}")
+    return t_ns
+
+
+def find_interval_or_nearest(left_ns: np.ndarray, max_right_ns: np.ndarray, t) -> Tuple[int, bool]:
     """
     Find the interval containing a timestamp or the nearest interval.
     
+    Uses binary search, so each lookup is O(log N).
+    
+    Args:
+        left_ns: Interval starts as int64 nanoseconds, sorted ascending
+        max_right_ns: Running maximum of the matching interval ends
+            (np.maximum.accumulate), which keeps the search exact for overlaps
+        t: Timestamp to look up, or an int of UTC nanoseconds; tz-aware values
+            are converted to UTC
+    
     Returns:
         Tuple of (position, contains) where contains indicates if timestamp is within interval.
+        Position is -1 when there are no intervals at all.
     """
-    t = pd.Timestamp(t)
-    if t.tz is not None:
-        t = t.tz_convert('UTC').tz_localize(None)
-
-    mask = time_idx.contains(t)
-    mask_np = np.asarray(mask, dtype=bool)
-    if mask_np.any():
-        pos = int(np.flatnonzero(mask_np)[0])
-        return pos, True
-
-    # Distances via int64 ns to avoid .abs() on TimedeltaIndex
-    left_delta = (t - time_idx.left)            # TimedeltaIndex
-    right_delta = (time_idx.right - t)          # TimedeltaIndex
-    left_ns = np.abs(left_delta.asi8)           # int64 nanoseconds
-    right_ns = np.abs(right_delta.asi8)         # int64 nanoseconds
-    dist_ns = np.minimum(left_ns, right_ns)
-    pos = int(dist_ns.argmin())
-    return pos, False
+    if isinstance(t, (int, np.integer)):
+        t_ns = int(t)  # already int64 ns
+    else:
+        t_ns = to_utc_naive(t).value
+
+    n = len(left_ns)
+    if n == 0:
+        return -1, False
+
+    # i: last interval starting at or before t
+    # k: first interval whose end (running max) reaches t; its own end is that max
+    i = int(np.searchsorted(left_ns, t_ns, side='right')) - 1
+    k = int(np.searchsorted(max_right_ns, t_ns, side='left'))
+    if k <= i:
+        return k, True
+
+    # Nothing contains t. The closest interval either ends before t (the one
+    # reaching max_right_ns[i]) or is the next one to start after t.
+    if i < 0:
+        return 0, False
+    before_end = int(max_right_ns[i])
+    before = int(np.searchsorted(max_right_ns, before_end, side='left'))
+    if i + 1 >= n or t_ns - before_end <= int(left_ns[i + 1]) - t_ns:
+        return before, False
+    return i + 1, False
 
 
 class MyTimelineDB:
@@ -195,30 +501,54 @@ class MyTimelineDB:
             db_path: Path to the Google Timeline JSON file
         """
         self.db_path = db_path
-        self._time_idx = None
-        self._all_data = None
-        self._source_hash = None
+        self._interval_index: Optional[pd.IntervalIndex] = None
+        self._left_ns: Optional[np.ndarray] = None
+        self._right_ns: Optional[np.ndarray] = None
+        self._max_right_ns: Optional[np.ndarray] = None
+        self._lat: Optional[np.ndarray] = None
+        self._lon: Optional[np.ndarray] = None
+        self._kind: Optional[np.ndarray] = None
+        self._source_hash: Optional[str] = None
+        self._reset_lookup_cache()
         self._initialize_db()
         
     def _get_file_hash(self, file_path: str) -> str:
-        """Calculate SHA256 hash of a file for change detection."""
+        """
+        Return a change-detection stamp for a file: its path, size and mtime (ns).
+        
+        A single os.stat call instead of hashing the contents; the path is part of
+        the stamp because every timeline in a directory shares one .timeline_cache.
+        """
+        try:
+            st = os.stat(file_path)
+        except OSError as e:
+            logger.warning("Failed to stat %s: %s", file_path, e)
+            return None
+        return f"{os.path.abspath(file_path)}:{st.st_size}:{st.st_mtime_ns}"
+    
+    def _get_content_digest(self, file_path: str) -> Optional[str]:
+        """
+        Return a BLAKE2b digest of a file's contents.
+        
+        Only consulted when the stat stamp changed, to tell a touched or copied
+        file from an edited one; read in 1 MiB blocks.
+        """
         import hashlib
-        sha256_hash = hashlib.sha256()
+        digest = hashlib.blake2b(digest_size=16)
         try:
             with open(file_path, "rb") as f:
-                # Read and update hash in chunks of 4K
-                for byte_block in iter(lambda: f.read(4096), b""):
-                    sha256_hash.update(byte_block)
-            return sha256_hash.hexdigest()
-        except Exception as e:
-            logger.warning("Failed to calculate file hash for %s: %s", file_path, e)
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        except OSError as e:
+            logger.warning("Failed to read %s for its digest: %s", file_path, e)
             return None
+        return digest.hexdigest()
         
     def _initialize_db(self):
         """Initialize the database, loading from cache if available and valid."""
         cache_dir = os.path.join(os.path.dirname(self.db_path), ".timeline_cache")
         
-        # Calculate current source file hash
+        # Stamp of the current source file (path, size, mtime)
         current_hash = self._get_file_hash(self.db_path)
         self._source_hash = current_hash
         
@@ -228,27 +558,49 @@ class MyTimelineDB:
             return
 
         logger.info("Loading timeline data from %s", self.db_path)
-        with open(self.db_path, 'r') as fp:
-            all_history = json.load(fp)
-        logger.info("Done loading timeline data from %s", self.db_path)
         
-        all_interval_tuples = []
-        for item in tqdm(all_history, desc="Processing timeline entries"):
+        # Collect raw strings and coordinates per row in one pass, then convert
+        # the times vectorized; entries without top-level startTime/endTime are
+        # resolved afterwards
+        start_raws, end_raws, geo = [], [], []
+        fallback_pos, fallback_items = [], []
+        for item in tqdm(iter_timeline_entries(self.db_path), desc="Processing timeline entries"):
             if 'visit' not in item and 'activity' not in item and "timelinePath" not in item:
                 continue  # skip non-interval entries
             
-            start_dt, end_dt, _ = extract_interval(json.dumps(item))
-            if start_dt is None or end_dt is None:
-                continue
-            
-            s = to_utc_naive(start_dt)
-            e = to_utc_naive(end_dt)
-            if s > e:  # optional guard
-                s, e = e, s
-            all_interval_tuples.append((s, e))
-
-        self._time_idx = pd.IntervalIndex.from_tuples(all_interval_tuples, closed='both')
-        self._all_data = all_history
+            start_raw, end_raw = _top_level_raw(item)
+            if start_raw is None:
+                fallback_pos.append(len(start_raws))
+                fallback_items.append(item)
+            start_raws.append(start_raw)
+            end_raws.append(end_raw)
+            geo.append(entry_location(item))
+        
+        if fallback_items:
+            extracted = extract_raw_intervals(fallback_items)
+            for pos, (start_raw, end_raw) in zip(fallback_pos, extracted):
+                start_raws[pos], end_raws[pos] = start_raw, end_raw
+        logger.info("Done loading timeline data from %s", self.db_path)
+        
+        if geo:
+            lat, lon, kind = (np.array(col) for col in zip(*geo))
+        else:
+            lat, lon, kind = np.empty(0), np.empty(0), np.empty(0, dtype=np.int8)
+
+        # Missing or unparseable times become NaT; drop those rows everywhere, along
+        # with rows that carry no location (e.g. timelinePath), which could otherwise
+        # shadow an overlapping visit or activity in find_interval_or_nearest
+        left = to_utc_naive_array(start_raws)
+        right = to_utc_naive_array(end_raws)
+        valid = ~(left.isna() | right.isna()) & (kind != KIND_NONE)
+        if not valid.all():
+            left, right = left[valid], right[valid]
+            lat, lon, kind = lat[valid], lon[valid], kind[valid]
+        
+        # Order each pair (guard against reversed entries) on the int64 ns values
+        left_ns, right_ns = left.asi8, right.asi8
+        self._set_intervals(np.minimum(left_ns, right_ns), np.maximum(left_ns, right_ns),
+                            lat, lon, kind)
         
         # Save cache for fast reloads
         try:
@@ -257,60 +609,124 @@ class MyTimelineDB:
         except Exception as e:
             logger.warning("Failed to save timeline cache: %s", e)
 
+    def _set_intervals(self, left_ns: np.ndarray, right_ns: np.ndarray,
+                       lat: np.ndarray, lon: np.ndarray, kind: np.ndarray):
+        """
+        Install interval bounds (int64 ns) and their coordinates, sorted by start time.
+        
+        Also derives the running maximum of the ends used by find_interval_or_nearest.
+        """
+        left_ns = np.asarray(left_ns, dtype=np.int64)
+        right_ns = np.asarray(right_ns, dtype=np.int64)
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        kind = np.asarray(kind, dtype=np.int8)
+        if np.any(left_ns[1:] < left_ns[:-1]):
+            order = np.argsort(left_ns, kind='stable')
+            left_ns, right_ns = left_ns[order], right_ns[order]
+            lat, lon, kind = lat[order], lon[order], kind[order]
+
+        self._left_ns = left_ns
+        self._right_ns = right_ns
+        self._max_right_ns = np.maximum.accumulate(right_ns)
+        self._lat, self._lon, self._kind = lat, lon, kind
+        self._interval_index = None
+        self._reset_lookup_cache()
+
+    def _reset_lookup_cache(self):
+        """Start an empty memo of lookups for this instance's current intervals."""
+        self._lookup = functools.lru_cache(maxsize=LOOKUP_CACHE_SIZE)(self._lookup_uncached)
+
+    @property
+    def _time_idx(self) -> Optional[pd.IntervalIndex]:
+        """IntervalIndex over the intervals, built on first access; lookups use the raw arrays."""
+        if self._interval_index is None and self._left_ns is not None:
+            self._interval_index = pd.IntervalIndex.from_arrays(
+                pd.to_datetime(np.asarray(self._left_ns)),
+                pd.to_datetime(np.asarray(self._right_ns)),
+                closed='both',
+            )
+        return self._interval_index
+
     def _save_cache(self, cache_dir: Optional[str] = None, source_hash: Optional[str] = None) -> Dict[str, str]:
         """
         Persist parsed data for fast reloads.
         
+        Each array is written as its own .npy file so _load_cache can memory-map it.
+        
         Args:
             cache_dir: Cache directory path
-            source_hash: SHA256 hash of the source file for validation
+            source_hash: Source file stamp from _get_file_hash, for validation
             
         Returns:
             Dict with written file paths
         """
-        if self._time_idx is None or self._all_data is None:
-            raise ValueError("Nothing to cache yet: _time_idx/_all_data are None")
+        if self._left_ns is None or self._lat is None:
+            raise ValueError("Nothing to cache yet: _left_ns/_lat are None")
 
         cache_dir = cache_dir or os.path.join(os.path.dirname(self.db_path), ".timeline_cache")
         os.makedirs(cache_dir, exist_ok=True)
 
-        # Store IntervalIndex efficiently as int64 nanoseconds
-        left_ns = self._time_idx.left.asi8
-        right_ns = self._time_idx.right.asi8
-        intervals_path = os.path.join(cache_dir, "intervals.npz")
-        np.savez(intervals_path, left_ns=left_ns, right_ns=right_ns)
+        paths = {}
+        for name in _CACHE_ARRAYS:
+            path = os.path.join(cache_dir, f"{name}.npy")
+            # Write beside and rename, so instances still mapping the old file keep a valid view
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, getattr(self, f"_{name}"))
+            os.replace(tmp_path, path)
+            paths[name] = path
 
-        # Store all_data via pickle for fastest Python loads
-        all_data_path = os.path.join(cache_dir, "all_data.pkl")
-        with open(all_data_path, "wb") as f:
-            pickle.dump(self._all_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(os.path.join(cache_dir, "cache_version.txt"), "w") as f:
+            f.write(CACHE_FORMAT_VERSION)
 
-        # Store source file hash for cache validation
+        for name in _LEGACY_CACHE_FILES:
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except FileNotFoundError:
+                pass
+
+        # Store source file stamp (and content digest, for touched files) for cache validation
         if source_hash:
             hash_path = os.path.join(cache_dir, "source_hash.txt")
             with open(hash_path, "w") as f:
                 f.write(source_hash)
+            digest = self._get_content_digest(self.db_path)
+            if digest:
+                with open(os.path.join(cache_dir, "source_digest.txt"), "w") as f:
+                    f.write(digest)
 
-        return {"intervals": intervals_path, "all_data": all_data_path}
+        return paths
 
     def _load_cache(self, cache_dir: Optional[str] = None, current_hash: Optional[str] = None) -> bool:
         """
         Load previously cached timeline data if still valid.
         
+        The arrays are memory-mapped read-only rather than read into memory.
+        
         Args:
             cache_dir: Cache directory path
-            current_hash: Current SHA256 hash of the source file for validation
+            current_hash: Current source file stamp from _get_file_hash, for validation
             
         Returns:
             True if successful and cache is still valid
         """
         cache_dir = cache_dir or os.path.join(os.path.dirname(self.db_path), ".timeline_cache")
-        intervals_path = os.path.join(cache_dir, "intervals.npz")
-        all_data_path = os.path.join(cache_dir, "all_data.pkl")
+        paths = {name: os.path.join(cache_dir, f"{name}.npy") for name in _CACHE_ARRAYS}
         hash_path = os.path.join(cache_dir, "source_hash.txt")
 
         # Check if cache files exist
-        if not (os.path.exists(intervals_path) and os.path.exists(all_data_path)):
+        if not all(os.path.exists(path) for path in paths.values()):
+            return False
+
+        # Arrays written by an older format cannot be reused, whatever the source stamp
+        try:
+            with open(os.path.join(cache_dir, "cache_version.txt"), "r") as f:
+                cached_version = f.read().strip()
+        except OSError:
+            cached_version = None
+        if cached_version != CACHE_FORMAT_VERSION:
+            logger.info("Cache invalidated - written by cache format %s", cached_version)
             return False
 
         # Validate cache if current hash is provided
@@ -319,52 +735,105 @@ class MyTimelineDB:
                 with open(hash_path, "r") as f:
                     cached_hash = f.read().strip()
                 if cached_hash != current_hash:
-                    logger.info("Cache invalidated - source file has changed")
-                    return False
+                    if not self._content_unchanged(cache_dir):
+                        logger.info("Cache invalidated - source file has changed")
+                        return False
+                    # Same bytes under a new stamp (touched or copied): adopt the stamp
+                    with open(hash_path, "w") as f:
+                        f.write(current_hash)
             except Exception as e:
                 logger.warning("Failed to read cache validation hash: %s", e)
                 return False
 
         try:
-            arrs = np.load(intervals_path)
-            left = pd.to_datetime(arrs["left_ns"])  # from int64 ns
-            right = pd.to_datetime(arrs["right_ns"])  # from int64 ns
-            self._time_idx = pd.IntervalIndex.from_arrays(left, right, closed='both')
-            with open(all_data_path, "rb") as f:
-                self._all_data = pickle.load(f)
-            return True
+            arrays = {name: np.load(path, mmap_mode='r') for name, path in paths.items()}
+            if len({len(arr) for arr in arrays.values()}) != 1:
+                raise ValueError("cached arrays have mismatched lengths")
         except Exception as e:
             logger.warning("Failed loading timeline cache from %s: %s", cache_dir, e)
             return False
+
+        for name, arr in arrays.items():
+            setattr(self, f"_{name}", arr)
+        self._interval_index = None
+        self._reset_lookup_cache()
+        return True
         
-    def get_location_at_time(self, year: int, month: int, day: int, hour: int, minute: int) -> Dict[str, float]:
+    def _content_unchanged(self, cache_dir: str) -> bool:
+        """Check the source file's contents against the digest stored with the cache."""
+        digest_path = os.path.join(cache_dir, "source_digest.txt")
+        if not os.path.exists(digest_path):
+            return False
+        with open(digest_path, "r") as f:
+            cached_digest = f.read().strip()
+        return cached_digest == self._get_content_digest(self.db_path)
+        
+    def get_location_at_time(self, year: int, month: int, day: int, hour: int, minute: int
+                             ) -> Dict[str, Optional[float]]:
         """
         Get location at a specific time.
         
+        Results are memoized, so repeating a query costs a dict lookup.
+        
         Args:
             year, month, day, hour, minute: Time components
             
         Returns:
             Dict with latitude and longitude, or None values if not found
         """
-        if self._time_idx is None or self._all_data is None:
-            return {"latitude": None, "longitude": None}
+        latitude, longitude = self._lookup(year, month, day, hour, minute)
+        return {"latitude": latitude, "longitude": longitude}
+    
+    def get_locations_at_times(self, timestamps) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get locations for many times in one vectorized pass.
+        
+        Args:
+            timestamps: Array-like (list, numpy array, pandas Series/DatetimeIndex) of
+                ISO-8601 strings, datetime64 values, pandas Timestamps or datetimes,
+                which may be mixed; a single such value is treated as a batch of one.
+                Naive values are read as UTC, tz-aware ones converted to UTC
             
-        t = pd.Timestamp(year=year, month=month, day=day, hour=hour, minute=minute, second=0)
-        pos, contains = find_interval_or_nearest(self._time_idx, t)
+        Returns:
+            Tuple of (latitude, longitude) float64 arrays aligned with timestamps,
+            NaN where no location is found
+        """
+        if np.ndim(timestamps) == 0:
+            timestamps = [timestamps]
+        # An explicit format keeps pandas from inferring one from the first string
+        times = pd.DatetimeIndex(
+            pd.to_datetime(timestamps, utc=True, format='ISO8601')
+        ).tz_convert(None)
+        t_ns = times.as_unit('ns').asi8
         
-        if not contains:
-            return {"latitude": None, "longitude": None}
+        latitude = np.full(len(t_ns), np.nan)
+        longitude = np.full(len(t_ns), np.nan)
+        left_ns, max_right_ns, lat, lon = self._left_ns, self._max_right_ns, self._lat, self._lon
+        if left_ns is None or max_right_ns is None or lat is None or lon is None or len(left_ns) == 0:
+            return latitude, longitude
+        
+        # Same containment test as find_interval_or_nearest, for all times at once
+        i = np.searchsorted(left_ns, t_ns, side='right') - 1
+        k = np.searchsorted(max_right_ns, t_ns, side='left')
+        hit = (k <= i) & ~times.isna()
+        latitude[hit] = lat[k[hit]]
+        longitude[hit] = lon[k[hit]]
+        return latitude, longitude
+    
+    def _lookup_uncached(self, year: int, month: int, day: int, hour: int, minute: int
+                         ) -> Tuple[Optional[float], Optional[float]]:
+        """Resolve (latitude, longitude) at a time against the interval arrays."""
+        left_ns, max_right_ns, lat, lon = self._left_ns, self._max_right_ns, self._lat, self._lon
+        if left_ns is None or max_right_ns is None or lat is None or lon is None:
+            return None, None
             
-        item = self._all_data[pos]
+        t_ns = query_time_ns(year, month, day, hour, minute)
+        pos, contains = find_interval_or_nearest(left_ns, max_right_ns, t_ns)
         
-        if 'visit' in item:
-            return parse_geo_uri(item['visit']['topCandidate']['placeLocation'])
-        elif 'activity' in item:
-            # TODO: better handling of activities by relating to start/end times
-            return parse_geo_uri(item['activity']['start'])
+        if not contains:
+            return None, None
         
-        return {"latitude": None, "longitude": None}
+        return float(lat[pos]), float(lon[pos])
 
 
 def main():
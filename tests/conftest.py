@@ -65,14 +65,14 @@ def timeline_db(temp_timeline_file):
 @pytest.fixture
 def mock_ai_client():
     """Fixture providing a mock AI client for testing."""
-    with patch('where_was_eye.agent.OpenAIClient') as mock_client:
+    with patch('openai.OpenAI') as mock_client:
         yield mock_client
 
 
 @pytest.fixture
 def mock_ollama_client():
     """Fixture providing a mock Ollama client for testing."""
-    with patch('where_was_eye.agent.OllamaClient') as mock_client:
+    with patch('ollama.Client') as mock_client:
         yield mock_client
 
 
@@ -0,0 +1,282 @@
+"""
+Tests for the AI agent integration.
+"""
+import asyncio
+import json
+import os
+import threading
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+from where_was_eye import agent as agent_module
+from where_was_eye.agent import WhereWasEyeAgent, create_agent
+from where_was_eye.timeline_db import MyTimelineDB
+
+
+@pytest.fixture(autouse=True)
+def clear_agent_caches():
+    """Reset the shared timeline/client caches between tests."""
+    agent_module._get_timeline_db.cache_clear()
+    agent_module._get_openai_client.cache_clear()
+    agent_module._get_ollama_client.cache_clear()
+    yield
+    agent_module._get_timeline_db.cache_clear()
+    agent_module._get_openai_client.cache_clear()
+    agent_module._get_ollama_client.cache_clear()
+
+
+def _stream_chunk(content=None, tool_calls=None, finish_reason=None):
+    """Build a minimal stand-in for an OpenAI ChatCompletionChunk."""
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)])
+
+
+def _tool_call_delta(index, arguments, call_id=None, name=None):
+    """Build a minimal stand-in for a streamed tool-call fragment."""
+    return SimpleNamespace(
+        index=index, id=call_id, function=SimpleNamespace(name=name, arguments=arguments)
+    )
+
+
+def _watch_lookups():
+    """Count uncached timeline lookups made by databases built inside the block."""
+    return patch.object(
+        MyTimelineDB, "_lookup_uncached", autospec=True, side_effect=MyTimelineDB._lookup_uncached
+    )
+
+
+def test_create_agent_shares_timeline_and_client(temp_timeline_file, mock_ai_client):
+    """Agents pointing at the same file reuse one parsed timeline and client."""
+    agent1 = create_agent(timeline_db_path=temp_timeline_file, openai_api_key="test-key")
+    agent2 = create_agent(timeline_db_path=temp_timeline_file, openai_api_key="test-key")
+
+    assert agent1.timeline_db is agent2.timeline_db
+    assert agent1._client is agent2._client
+    mock_ai_client.assert_called_once_with(api_key="test-key")
+
+
+def test_timeline_reloaded_after_file_change(temp_timeline_file, mock_ai_client):
+    """A modified timeline file is parsed again instead of served from memory."""
+    agent1 = create_agent(timeline_db_path=temp_timeline_file, openai_api_key="test-key")
+
+    mtime = os.path.getmtime(temp_timeline_file)
+    os.utime(temp_timeline_file, (mtime + 10, mtime + 10))
+
+    agent2 = create_agent(timeline_db_path=temp_timeline_file, openai_api_key="test-key")
+    assert agent1.timeline_db is not agent2.timeline_db
+
+
+def test_run_tool_caches_repeated_lookups(temp_timeline_file, mock_ai_client):
+    """Identical tool calls are answered without querying the database again."""
+    args = {"year": 2020, "month": 1, "day": 1, "hour": 12, "minute": 0}
+
+    with _watch_lookups() as lookup:
+        agent = create_agent(timeline_db_path=temp_timeline_file, openai_api_key="test-key")
+        first = agent._run_tool("get_location_at_time", dict(args))
+        second = agent._run_tool("get_location_at_time", dict(args))
+
+    assert first == second
+    assert lookup.call_count == 1
+
+
+def test_run_tool_buckets_minutes(temp_timeline_file, mock_ai_client):
+    """Minutes within the same bucket resolve to a single database lookup."""
+    with _watch_lookups() as lookup:
+        agent = create_agent(
+            timeline_db_path=temp_timeline_file, openai_api_key="test-key", time_bucket_minutes=15
+        )
+        for minute in (0, 7, 14):
+            agent._run_tool(
+                "get_location_at_time",
+                {"year": 2020, "month": 1, "day": 1, "hour": 12, "minute": minute},
+            )
+
+    lookup.assert_called_once_with(agent.timeline_db, 2020, 1, 1, 12, 0)
+
+
+def test_run_async_answers_off_the_event_loop(temp_timeline_file, mock_ai_client):
+    """run_async delegates to run() on a worker thread."""
+    agent = create_agent(timeline_db_path=temp_timeline_file, openai_api_key="test-key")
+    threads = []
+
+    def fake_run(question):
+        threads.append(threading.current_thread())
+        return f"answer to {question}"
+
+    with patch.object(agent, "run", side_effect=fake_run):
+        answer = asyncio.run(agent.run_async("Where was I?"))
+
+    assert answer == "answer to Where was I?"
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_run_openai_streams_tool_call(temp_timeline_file, mock_ai_client):
+    """Streamed tool-call fragments are assembled, executed and sent back."""
+    agent = create_agent(timeline_db_path=temp_timeline_file, openai_api_key="test-key")
+    stream = [
+        _stream_chunk(tool_calls=[_tool_call_delta(0, "", "call_1", "get_location_at_time")]),
+        _stream_chunk(tool_calls=[_tool_call_delta(0, '{"year": 2020, "month": 1, ')]),
+        _stream_chunk(tool_calls=[_tool_call_delta(0, '"day": 1, "hour": 12, "minute": 0}')]),
+        _stream_chunk(finish_reason="tool_calls"),
+    ]
+    final = [_stream_chunk(content="No data "), _stream_chunk(content="for that time", finish_reason="stop")]
+    agent._client = Mock()
+    agent._client.chat.completions.create.side_effect = [iter(stream), iter(final)]
+
+    assert agent.run("Where was I on 2020-01-01 at noon?") == "No data for that time"
+
+    followup = agent._client.chat.completions.create.call_args_list[1].kwargs["messages"]
+    assert followup[-2]["tool_calls"][0]["function"]["arguments"] == (
+        '{"year": 2020, "month": 1, "day": 1, "hour": 12, "minute": 0}'
+    )
+    assert followup[-1]["role"] == "tool"
+    assert followup[-1]["tool_call_id"] == "call_1"
+    assert json.loads(followup[-1]["content"]) == {"latitude": None, "longitude": None}
+
+
+def test_run_ollama_folds_system_prompt_into_first_user_message(temp_timeline_file, mock_ollama_client):
+    """The system prompt is merged into the first user message for Ollama."""
+    agent = create_agent(provider="ollama", model="llama3.1", timeline_db_path=temp_timeline_file)
+    agent._client = Mock()
+    agent._client.chat.return_value = iter([
+        SimpleNamespace(message=SimpleNamespace(content="I don't know", tool_calls=None))
+    ])
+
+    assert agent.run("Where was I?") == "I don't know"
+
+    sent = agent._client.chat.call_args.kwargs["messages"]
+    assert len(sent) == 1
+    assert sent[0]["role"] == "user"
+    assert sent[0]["content"] == agent.SYSTEM_PROMPT + "\n\nWhere was I?"
+
+
+def test_subclass_system_prompt_is_sent(temp_timeline_file, mock_ai_client):
+    """A subclass overriding SYSTEM_PROMPT sends its own prompt."""
+    class TerseAgent(WhereWasEyeAgent):
+        SYSTEM_PROMPT = "Answer in one word."
+
+    agent = TerseAgent(agent_module.AgentConfig(
+        timeline_db_path=temp_timeline_file, openai_api_key="test-key"
+    ))
+    agent._client = Mock()
+    agent._client.chat.completions.create.return_value = iter(
+        [_stream_chunk(content="Nowhere", finish_reason="stop")]
+    )
+
+    agent.run("Where was I?")
+
+    sent = agent._client.chat.completions.create.call_args.kwargs["messages"]
+    assert sent[0]["content"] == "Answer in one word."
+
+
+def test_run_tool_rejects_out_of_range_arguments(temp_timeline_file, mock_ai_client):
+    """Invalid tool arguments from the model raise a ValueError."""
+    agent = create_agent(timeline_db_path=temp_timeline_file, openai_api_key="test-key")
+
+    with pytest.raises(ValueError):
+        agent._run_tool(
+            "get_location_at_time",
+            {"year": 2024, "month": 13, "day": 1, "hour": 12, "minute": 0},
+        )
+
+
+def test_run_answers_explicit_time_in_one_round_trip(temp_timeline_file, mock_ai_client):
+    """A question with a numeric date and time skips the tool-selection call."""
+    agent = create_agent(timeline_db_path=temp_timeline_file, openai_api_key="test-key")
+    agent._client = Mock()
+    agent._client.chat.completions.create.return_value = iter(
+        [_stream_chunk(content="No location recorded then", finish_reason="stop")]
+    )
+
+    assert agent.run("Where was I on 2020-01-01 at 12:00?") == "No location recorded then"
+
+    agent._client.chat.completions.create.assert_called_once()
+    request = agent._client.chat.completions.create.call_args.kwargs
+    assert "tools" not in request
+    assert "get_location_at_time" in request["messages"][-1]["content"]
+
+
+def test_run_stream_passes_fast_path_answer_through(temp_timeline_file, mock_ai_client):
+    """Without tools the OpenAI answer is yielded chunk by chunk, not buffered."""
+    agent = create_agent(timeline_db_path=temp_timeline_file, openai_api_key="test-key")
+    agent._client = Mock()
+    agent._client.chat.completions.create.return_value = iter([
+        _stream_chunk(content="No location "),
+        _stream_chunk(content="recorded then", finish_reason="stop"),
+    ])
+
+    chunks = list(agent.run_stream("Where was I on 2020-01-01 at 12:00?"))
+
+    assert chunks == ["No location ", "recorded then"]
+
+
+@pytest.mark.parametrize("question", [
+    "Where was I on 2024-02-30 at 10:00?",
+    "Where was I on 1500-01-01 at 10:00?",
+    "Where was I between 2024-08-20 10:00 and 14:00?",
+])
+def test_run_leaves_unusable_explicit_times_to_tools(question, temp_timeline_file, mock_ai_client):
+    """Impossible dates and time ranges take the tool-calling path instead of the fast path."""
+    agent = create_agent(timeline_db_path=temp_timeline_file, openai_api_key="test-key")
+    agent._client = Mock()
+    agent._client.chat.completions.create.return_value = iter(
+        [_stream_chunk(content="I don't know", finish_reason="stop")]
+    )
+
+    assert agent.run(question) == "I don't know"
+    assert "tools" in agent._client.chat.completions.create.call_args.kwargs
+
+
+def test_cached_miss_revalidated_after_file_change(tmp_path, mock_ai_client):
+    """A cached miss is retried once the timeline file gains matching data."""
+    def visit(start, end, geo):
+        return {
+            "startTime": start,
+            "endTime": end,
+            "visit": {"topCandidate": {"placeLocation": geo}},
+        }
+
+    timeline_file = tmp_path / "timeline.json"
+    entries = [visit("2021-01-15T15:30:00Z", "2021-01-15T16:30:00Z", "geo:37.774900,-122.419400")]
+    timeline_file.write_text(json.dumps(entries))
+    agent = create_agent(timeline_db_path=str(timeline_file), openai_api_key="test-key")
+    args = {"year": 2024, "month": 8, "day": 20, "hour": 15, "minute": 45}
+
+    assert agent._run_tool("get_location_at_time", args)["latitude"] is None
+
+    entries.append(visit("2024-08-20T15:30:00Z", "2024-08-20T16:30:00Z", "geo:40.712800,-74.006000"))
+    timeline_file.write_text(json.dumps(entries))
+    mtime = os.path.getmtime(timeline_file)
+    os.utime(timeline_file, (mtime + 10, mtime + 10))
+
+    assert agent._run_tool("get_location_at_time", args) == {
+        "latitude": 40.7128, "longitude": -74.006
+    }
+
+
+def test_run_stream_yields_ollama_chunks(temp_timeline_file, mock_ollama_client):
+    """run_stream passes Ollama's answer chunks through, dropping text ahead of a tool call."""
+    agent = create_agent(provider="ollama", model="llama3.1", timeline_db_path=temp_timeline_file)
+    tool_call = SimpleNamespace(function=SimpleNamespace(
+        name="get_location_at_time",
+        arguments={"year": 2020, "month": 1, "day": 1, "hour": 12, "minute": 0},
+    ))
+    agent._client = Mock()
+    agent._client.chat.side_effect = [
+        iter([
+            SimpleNamespace(message=SimpleNamespace(content="Let me check. ", tool_calls=None)),
+            SimpleNamespace(message=SimpleNamespace(content="", tool_calls=[tool_call])),
+        ]),
+        iter([
+            SimpleNamespace(message=SimpleNamespace(content="No data ", tool_calls=None)),
+            SimpleNamespace(message=SimpleNamespace(content="for that time", tool_calls=None)),
+        ]),
+    ]
+
+    chunks = list(agent.run_stream("Where was I at noon on New Year's Day 2020?"))
+
+    assert chunks == ["No data ", "for that time"]
+    followup = agent._client.chat.call_args_list[1].kwargs["messages"]
+    assert followup[-1] == {"role": "tool", "content": '{"latitude":null,"longitude":null}'}
@@ -0,0 +1,113 @@
+"""
+Tests for the FastAPI server endpoints.
+"""
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from where_was_eye import server as server_module
+from where_was_eye.server import ServerConfig, create_app
+
+
+@pytest.fixture
+def client(temp_timeline_file):
+    """Fixture providing a test client backed by the temporary timeline file."""
+    app = create_app(ServerConfig(timeline_db_path=temp_timeline_file))
+    return TestClient(app)
+
+
+QUERY = {"year": 2020, "month": 1, "day": 1, "hour": 12, "minute": 0}
+
+
+def test_health_check(client):
+    """Health endpoint reports the service as healthy once the timeline has loaded."""
+    client.post("/get_location_at_time", json=QUERY)  # waits for the background load
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["status"] == "healthy"
+
+
+def test_health_reports_loading_until_timeline_ready(temp_timeline_file, monkeypatch):
+    """The app starts serving before the timeline is parsed; /health is 503 meanwhile."""
+    release = threading.Event()
+    build_db = server_module.MyTimelineDB
+
+    def slow_db(path):
+        release.wait(timeout=10)
+        return build_db(path)
+
+    monkeypatch.setattr(server_module, "MyTimelineDB", slow_db)
+    with TestClient(create_app(ServerConfig(timeline_db_path=temp_timeline_file))) as client:
+        response = client.get("/health")
+        assert response.status_code == 503
+        assert response.json()["status"] == "loading"
+
+        release.set()
+        assert client.post("/get_location_at_time", json=QUERY).status_code == 200
+        assert client.get("/health").status_code == 200
+
+
+def test_create_app_rejects_missing_timeline(tmp_path):
+    """A missing timeline file is reported at startup, not on the first request."""
+    with pytest.raises(FileNotFoundError):
+        create_app(ServerConfig(timeline_db_path=str(tmp_path / "missing.json")))
+
+
+def test_get_locations_at_times_batch(client):
+    """The batch endpoint answers every requested time in order."""
+    times = [
+        {"year": 2020, "month": 1, "day": 1, "hour": 12, "minute": 0},
+        {"year": 2021, "month": 6, "day": 1, "hour": 8, "minute": 30},
+    ]
+
+    response = client.post("/get_locations_at_times", json=times)
+
+    assert response.status_code == 200
+    results = response.json()
+    assert len(results) == len(times)
+    single = client.post("/get_location_at_time", json=times[0]).json()
+    assert results[0] == single
+
+
+def test_large_batch_runs_off_the_event_loop(client, monkeypatch):
+    """Batches above INLINE_BATCH_MAX are answered on a worker thread."""
+    on_event_loop = []
+    lookup = server_module._lookup_locations
+
+    def record_loop(timeline_db, requests):
+        try:
+            asyncio.get_running_loop()
+            on_event_loop.append(True)
+        except RuntimeError:
+            on_event_loop.append(False)
+        return lookup(timeline_db, requests)
+
+    monkeypatch.setattr(server_module, "_lookup_locations", record_loop)
+    monkeypatch.setattr(server_module, "INLINE_BATCH_MAX", 1)
+
+    small = client.post("/get_locations_at_times", json=[QUERY])
+    large = client.post("/get_locations_at_times", json=[QUERY, QUERY])
+
+    assert small.status_code == large.status_code == 200
+    assert len(large.json()) == 2
+    assert on_event_loop == [True, False]
+
+
+def test_mcp_get_location(temp_timeline_file):
+    """The MCP endpoint wraps the location with metadata and omits unset fields."""
+    app = create_app(ServerConfig(timeline_db_path=temp_timeline_file, enable_mcp=True))
+    client = TestClient(app)
+
+    response = client.post(
+        "/mcp/get_location",
+        json={"year": 2020, "month": 1, "day": 1, "hour": 12, "minute": 0},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "success": True,
+        "data": {"latitude": None, "longitude": None},
+        "metadata": {"source": "google_timeline", "query_time": "2020-01-01 12:00"},
+    }
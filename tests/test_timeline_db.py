@@ -4,10 +4,21 @@ Tests for the Google Timeline Database Parser.
 import os
 import json
 import tempfile
+import numpy as np
+import pandas as pd
 import pytest
 from pathlib import Path
+from unittest.mock import patch
 
-from src.where_was_eye.timeline_db import MyTimelineDB, extract_interval, parse_dt_loose
+from src.where_was_eye import timeline_db
+from src.where_was_eye.timeline_db import (
+    MyTimelineDB,
+    extract_interval,
+    extract_interval_from_obj,
+    extract_raw_intervals,
+    find_interval_or_nearest,
+    parse_dt_loose,
+)
 
 
 def create_test_timeline_file(file_path: str) -> None:
@@ -81,6 +92,136 @@ def test_extract_interval():
     assert start_dt is not None
     assert end_dt is not None
 
+    # Parsed mappings give the same answer as their JSON text, nested keys included
+    nested = {"segment": {"start": "2021-01-15T15:30:00Z"}, "legs": [{"END": "2021-01-15T16:30:00Z"}]}
+    assert extract_interval(nested) == extract_interval(json.dumps(nested))
+    assert extract_interval(nested)[2] == {
+        'start_raw': "2021-01-15T15:30:00Z", 'end_raw': "2021-01-15T16:30:00Z"
+    }
+
+
+def test_extract_interval_from_obj():
+    """Test interval extraction from already-parsed entries."""
+    start_dt, end_dt, meta = extract_interval_from_obj(
+        {"startTime": "2021-01-15T15:30:00Z", "endTime": "2021-01-15T16:30:00Z", "visit": {}}
+    )
+    assert start_dt == parse_dt_loose("2021-01-15T15:30:00Z")
+    assert end_dt == parse_dt_loose("2021-01-15T16:30:00Z")
+    assert meta['start_raw'] == "2021-01-15T15:30:00Z"
+
+    # Entries without top-level keys fall back to scanning the text
+    start_dt, end_dt, meta = extract_interval_from_obj(
+        {"segment": {"from": "2021-01-15T15:30:00Z", "to": "2021-01-15T16:30:00Z"}}
+    )
+    assert start_dt is not None
+    assert end_dt is not None
+
+
+def test_nested_segment_activity_skips_geo_values(tmp_path):
+    """Test that an activity's geo: start/end points are not taken as its times."""
+    entry = {
+        "segment": {"start": "2021-01-15T17:30:00Z", "end": "2021-01-15T18:30:00Z"},
+        "activity": {"start": "geo:37.784900,-122.429400", "end": "geo:37.794900,-122.439400"},
+    }
+    assert extract_raw_intervals([entry]) == [("2021-01-15T17:30:00Z", "2021-01-15T18:30:00Z")]
+    assert extract_interval(json.dumps(entry))[2] == {
+        'start_raw': "2021-01-15T17:30:00Z", 'end_raw': "2021-01-15T18:30:00Z"
+    }
+
+    temp_file = tmp_path / "timeline.json"
+    temp_file.write_text(json.dumps([entry]))
+    db = MyTimelineDB(str(temp_file))
+    assert db.get_location_at_time(2021, 1, 15, 18, 0) == {"latitude": 37.7849, "longitude": -122.4294}
+
+
+def test_extract_raw_intervals_parallel(monkeypatch):
+    """Test that the process pool path matches in-process extraction."""
+    items = [
+        {"segment": {"from": f"2021-01-{day:02d}T10:00:00Z", "to": f"2021-01-{day:02d}T11:00:00Z"}}
+        for day in range(1, 29)
+    ] + [{"segment": {}}]
+    expected = extract_raw_intervals(items)
+    assert expected[0] == ("2021-01-01T10:00:00Z", "2021-01-01T11:00:00Z")
+    assert expected[-1] == (None, None)
+
+    monkeypatch.setattr(timeline_db, "PARALLEL_FALLBACK_MIN", 1)
+    monkeypatch.setattr(timeline_db, "PARALLEL_CHUNK_SIZE", 5)
+    monkeypatch.setattr(timeline_db.os, "cpu_count", lambda: 2)
+    assert extract_raw_intervals(items) == expected
+
+
+def test_key_variants_skip_fallback(monkeypatch, tmp_path):
+    """Test that start_time/end_time keys are read directly, without the fallback scan."""
+    def no_fallback(items):
+        raise AssertionError("fallback extraction used")
+
+    monkeypatch.setattr(timeline_db, "extract_raw_intervals", no_fallback)
+    temp_file = tmp_path / "timeline.json"
+    temp_file.write_text(json.dumps([{
+        "visit": {"topCandidate": {"placeLocation": "geo:37.774900,-122.419400"}},
+        "start_time": "2021-01-15T15:30:00Z",
+        "end_time": "2021-01-15T16:30:00Z",
+    }]))
+
+    db = MyTimelineDB(str(temp_file))
+    assert db.get_location_at_time(2021, 1, 15, 15, 45) == {"latitude": 37.7749, "longitude": -122.4194}
+
+
+def test_null_location_does_not_abort_build(tmp_path):
+    """Test that an entry with an unusable location is skipped, not fatal."""
+    temp_file = tmp_path / "timeline.json"
+    temp_file.write_text(json.dumps([
+        {
+            "visit": {"topCandidate": {"placeLocation": None}},
+            "startTime": "2021-01-15T10:00:00Z",
+            "endTime": "2021-01-15T11:00:00Z",
+        },
+        {
+            "visit": {"topCandidate": {"placeLocation": "geo:37.774900,-122.419400"}},
+            "startTime": "2021-01-15T15:30:00Z",
+            "endTime": "2021-01-15T16:30:00Z",
+        },
+    ]))
+
+    db = MyTimelineDB(str(temp_file))
+    assert db.get_location_at_time(2021, 1, 15, 15, 45) == {"latitude": 37.7749, "longitude": -122.4194}
+
+
+def test_covering_timeline_path_does_not_hide_visit(tmp_path):
+    """Test that a long timelinePath segment does not shadow an overlapping visit."""
+    temp_file = tmp_path / "timeline.json"
+    temp_file.write_text(json.dumps([
+        {
+            "timelinePath": [{"point": "geo:37.770000,-122.410000", "durationMinutesOffsetFromStartTime": "0"}],
+            "startTime": "2021-01-15T00:00:00Z",
+            "endTime": "2021-01-16T00:00:00Z",
+        },
+        {
+            "visit": {"topCandidate": {"placeLocation": "geo:37.774900,-122.419400"}},
+            "startTime": "2021-01-15T15:30:00Z",
+            "endTime": "2021-01-15T16:30:00Z",
+        },
+    ]))
+
+    db = MyTimelineDB(str(temp_file))
+    assert db.get_location_at_time(2021, 1, 15, 15, 45) == {"latitude": 37.7749, "longitude": -122.4194}
+    latitude, _ = db.get_locations_at_times(["2021-01-15T15:45:00"])
+    assert latitude[0] == pytest.approx(37.7749)
+
+
+def test_reversed_interval_is_reordered(tmp_path):
+    """Test that an entry whose end precedes its start is stored in order."""
+    temp_file = tmp_path / "timeline.json"
+    temp_file.write_text(json.dumps([{
+        "visit": {"topCandidate": {"placeLocation": "geo:37.774900,-122.419400"}},
+        "startTime": "2021-01-15T16:30:00Z",
+        "endTime": "2021-01-15T15:30:00Z",
+    }]))
+
+    db = MyTimelineDB(str(temp_file))
+    assert db._left_ns[0] < db._right_ns[0]
+    assert db.get_location_at_time(2021, 1, 15, 16, 0) == {"latitude": 37.7749, "longitude": -122.4194}
+
 
 def test_parse_dt_loose():
     """Test loose datetime parsing."""
@@ -102,6 +243,23 @@ def test_parse_dt_loose():
     assert dt is None
 
 
+def test_find_interval_or_nearest():
+    """Test binary-search lookup, including overlapping intervals."""
+    # [0, 50] overlaps [10, 20]; [60, 70] comes after a gap
+    left_ns = np.array([0, 10, 60], dtype=np.int64)
+    right_ns = np.array([50, 20, 70], dtype=np.int64)
+    max_right_ns = np.maximum.accumulate(right_ns)
+
+    assert find_interval_or_nearest(left_ns, max_right_ns, 15) == (0, True)
+    assert find_interval_or_nearest(left_ns, max_right_ns, 30) == (0, True)
+    assert find_interval_or_nearest(left_ns, max_right_ns, 65) == (2, True)
+    # Gap between 50 and 60: nearest to 52 is the interval ending at 50
+    assert find_interval_or_nearest(left_ns, max_right_ns, 52) == (0, False)
+    assert find_interval_or_nearest(left_ns, max_right_ns, 58) == (2, False)
+    assert find_interval_or_nearest(left_ns, max_right_ns, 100) == (2, False)
+    assert find_interval_or_nearest(left_ns[:0], max_right_ns[:0], 15) == (-1, False)
+
+
 def test_timeline_db_initialization():
     """Test timeline database initialization with test data."""
     with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
@@ -112,13 +270,13 @@ def test_timeline_db_initialization():
         # Test initialization
         db = MyTimelineDB(temp_file)
         assert db._time_idx is not None
-        assert db._all_data is not None
+        assert db._lat is not None
         assert len(db._time_idx) == 3  # Should have 3 intervals
 
         # Test cache creation
         cache_dir = os.path.join(os.path.dirname(temp_file), ".timeline_cache")
-        assert os.path.exists(os.path.join(cache_dir, "intervals.npz"))
-        assert os.path.exists(os.path.join(cache_dir, "all_data.pkl"))
+        assert os.path.exists(os.path.join(cache_dir, "left_ns.npy"))
+        assert os.path.exists(os.path.join(cache_dir, "lat.npy"))
         assert os.path.exists(os.path.join(cache_dir, "source_hash.txt"))
 
     finally:
@@ -145,6 +303,10 @@ def test_get_location_at_time():
         assert location["latitude"] == 37.7749
         assert location["longitude"] == -122.4194
 
+        # Activities resolve to their start point
+        location = db.get_location_at_time(2021, 1, 15, 17, 45)
+        assert location == {"latitude": 37.7849, "longitude": -122.4294}
+
         # Test outside intervals (should return None)
         location = db.get_location_at_time(2020, 1, 1, 12, 0)
         assert location["latitude"] is None
@@ -159,6 +321,103 @@ def test_get_location_at_time():
             shutil.rmtree(cache_dir)
 
 
+def test_streamed_parse_matches_bulk(monkeypatch, tmp_path):
+    """Test that streaming the file with ijson builds the same arrays."""
+    pytest.importorskip("ijson")
+    temp_file = str(tmp_path / "timeline.json")
+    create_test_timeline_file(temp_file)
+
+    monkeypatch.setattr(timeline_db, "STREAM_PARSE_MIN_BYTES", 0)
+    streamed = list(timeline_db.iter_timeline_entries(temp_file))
+    with monkeypatch.context() as m:
+        m.setattr(timeline_db, "ijson", None)
+        assert streamed == list(timeline_db.iter_timeline_entries(temp_file))
+
+    db = MyTimelineDB(temp_file)
+    assert len(db._left_ns) == 3
+    assert db.get_location_at_time(2021, 1, 15, 15, 45) == {"latitude": 37.7749, "longitude": -122.4194}
+
+
+def test_get_locations_at_times_matches_scalar(tmp_path):
+    """Test that the batch lookup agrees with get_location_at_time."""
+    temp_file = str(tmp_path / "timeline.json")
+    create_test_timeline_file(temp_file)
+    db = MyTimelineDB(temp_file)
+
+    times = [(2021, 1, 15, 15, 45), (2021, 1, 15, 17, 0), (2021, 1, 15, 17, 45), (2020, 1, 1, 12, 0)]
+    stamps = np.array([f"{y}-{mo:02d}-{d:02d}T{h:02d}:{mi:02d}" for y, mo, d, h, mi in times],
+                      dtype="datetime64[ns]")
+    latitude, longitude = db.get_locations_at_times(stamps)
+
+    for t, lat, lon in zip(times, latitude, longitude):
+        expected = db.get_location_at_time(*t)
+        if expected["latitude"] is None:
+            assert np.isnan(lat) and np.isnan(lon)
+        else:
+            assert (lat, lon) == (expected["latitude"], expected["longitude"])
+    assert not np.isnan(latitude[0])
+
+
+def test_get_locations_at_times_mixed_inputs(tmp_path):
+    """Test that mixed ISO-8601 string layouts and scalar inputs are accepted."""
+    temp_file = str(tmp_path / "timeline.json")
+    create_test_timeline_file(temp_file)
+    db = MyTimelineDB(temp_file)
+
+    latitude, longitude = db.get_locations_at_times(["2021-01-15T15:45", "2021-01-15 17:45:00"])
+    assert latitude.tolist() == [37.7749, 37.7849]
+    assert longitude.tolist() == [-122.4194, -122.4294]
+
+    latitude, _ = db.get_locations_at_times(pd.Timestamp("2021-01-15T15:45Z"))
+    assert latitude.tolist() == [37.7749]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_malformed_file_raises_json_decode_error(monkeypatch, tmp_path, stream):
+    """Test that a truncated file fails with json.JSONDecodeError whichever parser runs."""
+    if stream:
+        pytest.importorskip("ijson")
+        monkeypatch.setattr(timeline_db, "STREAM_PARSE_MIN_BYTES", 0)
+    else:
+        monkeypatch.setattr(timeline_db, "ijson", None)
+    temp_file = tmp_path / "timeline.json"
+    temp_file.write_text('[{"startTime": "2021-01-15T15:30:00Z", "endTime": ')
+
+    with pytest.raises(json.JSONDecodeError):
+        MyTimelineDB(str(temp_file))
+
+
+def test_get_location_at_time_memoized():
+    """Test that repeated queries are answered from the lookup cache."""
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+        create_test_timeline_file(f.name)
+        temp_file = f.name
+
+    try:
+        with patch.object(MyTimelineDB, "_lookup_uncached", autospec=True,
+                          side_effect=MyTimelineDB._lookup_uncached) as lookup:
+            db = MyTimelineDB(temp_file)
+            first = db.get_location_at_time(2021, 1, 15, 15, 45)
+            first["latitude"] = 0.0  # callers get their own dict
+            second = db.get_location_at_time(2021, 1, 15, 15, 45)
+
+            # A second timeline keeps its own memo and leaves the first one intact
+            other = MyTimelineDB(temp_file)
+            other.get_location_at_time(2021, 1, 15, 15, 45)
+            db.get_location_at_time(2021, 1, 15, 15, 45)
+
+        assert lookup.call_count == 2
+        assert second == {"latitude": 37.7749, "longitude": -122.4194}
+
+    finally:
+        if os.path.exists(temp_file):
+            os.unlink(temp_file)
+        cache_dir = os.path.join(os.path.dirname(temp_file), ".timeline_cache")
+        if os.path.exists(cache_dir):
+            import shutil
+            shutil.rmtree(cache_dir)
+
+
 def test_cache_validation():
     """Test that cache is invalidated when source file changes."""
     with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
@@ -202,6 +461,62 @@ def test_cache_validation():
             shutil.rmtree(cache_dir)
 
 
+def test_cache_kept_when_file_only_touched(monkeypatch, tmp_path):
+    """Test that a new mtime with unchanged contents reuses the cache."""
+    temp_file = str(tmp_path / "timeline.json")
+    create_test_timeline_file(temp_file)
+    db1 = MyTimelineDB(temp_file)
+
+    mtime = os.path.getmtime(temp_file)
+    os.utime(temp_file, (mtime + 10, mtime + 10))
+
+    def no_parse(path):
+        raise AssertionError("timeline reparsed")
+
+    monkeypatch.setattr(timeline_db, "iter_timeline_entries", no_parse)
+    db2 = MyTimelineDB(temp_file)
+    assert db2._source_hash != db1._source_hash
+    assert len(db2._left_ns) == 3
+    with open(os.path.join(str(tmp_path), ".timeline_cache", "source_hash.txt")) as f:
+        assert f.read() == db2._source_hash
+
+
+def test_cache_from_older_format_rebuilt(monkeypatch, tmp_path):
+    """Test that a cache written by another cache format version is not reused."""
+    temp_file = str(tmp_path / "timeline.json")
+    create_test_timeline_file(temp_file)
+    MyTimelineDB(temp_file)
+    version_path = tmp_path / ".timeline_cache" / "cache_version.txt"
+    assert version_path.read_text() == timeline_db.CACHE_FORMAT_VERSION
+
+    version_path.write_text("1")
+    parsed = []
+    iter_entries = timeline_db.iter_timeline_entries
+    monkeypatch.setattr(timeline_db, "iter_timeline_entries",
+                        lambda path: parsed.append(path) or iter_entries(path))
+    db = MyTimelineDB(temp_file)
+
+    assert parsed == [temp_file]
+    assert len(db._left_ns) == 3
+    assert version_path.read_text() == timeline_db.CACHE_FORMAT_VERSION
+
+
+def test_legacy_cache_files_removed(tmp_path):
+    """Test that writing the cache deletes files left by the old pickle layout."""
+    temp_file = str(tmp_path / "timeline.json")
+    create_test_timeline_file(temp_file)
+    cache_dir = tmp_path / ".timeline_cache"
+    cache_dir.mkdir()
+    for name in ("all_data.pkl", "intervals.npz"):
+        (cache_dir / name).write_bytes(b"stale")
+
+    MyTimelineDB(temp_file)
+
+    assert not (cache_dir / "all_data.pkl").exists()
+    assert not (cache_dir / "intervals.npz").exists()
+    assert (cache_dir / "left_ns.npy").exists()
+
+
 def test_cache_roundtrip():
     """Test cache save and load functionality."""
     with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
@@ -222,6 +537,7 @@ def test_cache_roundtrip():
         db2 = MyTimelineDB(temp_file)
         success = db2._load_cache(test_cache_dir, current_hash)
         assert success
+        assert isinstance(db2._left_ns, np.memmap)
         n2 = len(db2._time_idx)
 
         assert n1 == n2